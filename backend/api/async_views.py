@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.urls import URLPattern
+
+from .instrumentation import current_metrics
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='db'
+)
+
+
+def database_sync_to_async(function):
+    """Run ``function`` on the database thread pool.
+
+    Django 3.2 has no async ORM, so async views await their queries
+    through this pool. Connections are recycled around each call the
+    way the request signals do it for sync views.
+    """
+
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            with ExitStack() as stack:
+                metrics = current_metrics.get()
+                if metrics is not None:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(metrics.execute)
+                        )
+                return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=executor)
+
+
+def async_view(view):
+    """Serve a sync DRF view from the event loop.
+
+    The view queries, serializes and renders on the database pool, so a
+    slow query holds one pool thread and a slow client holds nothing.
+    """
+
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if not response.streaming and hasattr(response, 'render'):
+            response.render()
+        return response
+
+    render = database_sync_to_async(render)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await render(request, *args, **kwargs)
+
+    return wrapper
+
+
+def serve_async(pattern):
+    return URLPattern(
+        pattern.pattern, async_view(pattern.callback),
+        pattern.default_args, pattern.name
+    )
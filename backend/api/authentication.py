@@ -0,0 +1,103 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from django.conf import settings
+
+from .cache import get_cache
+
+REVOKED = 'revoked'
+REVOKED_TIMEOUT = 30
+
+
+def get_token_cache_key(key):
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+class TokenCache:
+    """Bounded in-process LRU of authenticated tokens.
+
+    Entries expire after ``timeout`` seconds, which bounds how long
+    another process keeps accepting a token revoked elsewhere.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        if not self.timeout or not self.max_size:
+            return
+        with self.lock:
+            self.entries[key] = (token, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_LOCAL_TIMEOUT
+)
+
+
+def invalidate_token(key):
+    """Forget a token in this process and in the shared cache.
+
+    The shared entry is replaced by a marker rather than deleted, so a
+    request that read the token before it was revoked cannot put it back.
+    """
+    token_cache.discard(key)
+    get_cache().set(get_token_cache_key(key), REVOKED, REVOKED_TIMEOUT)
+
+
+def invalidate_user_tokens(user):
+    for key in Token.objects.filter(user=user).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the database for known tokens.
+
+    Tokens are looked up in the in-process LRU, then in the shared cache
+    for ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds, and only then in the token
+    table. Each request gets its own copy of the cached user.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            cache_key = get_token_cache_key(key)
+            token = get_cache().get(cache_key)
+            if token is None or token == REVOKED:
+                user, token = super().authenticate_credentials(key)
+                if not get_cache().add(
+                    cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT
+                ):
+                    return user, token
+            token_cache.set(key, token)
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
@@ -0,0 +1,115 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from foodgram.replicas import use_primary
+from recipes.models import Ingredient
+
+from .cache import get_cache_version
+
+
+class IngredientIndex:
+    """In-memory sorted index of ingredient names.
+
+    Keeps ``(lowercased name, pk)`` pairs in a sorted list, so prefix
+    matches are one bisect away. The index is rebuilt whenever the
+    ``ingredients`` cache version moves on, and is patched in place for
+    changes made by the current process. It is also rebuilt every
+    ``max_age`` seconds, since changes made by other processes only
+    move the version on when the cache is shared between them.
+    """
+
+    namespace = 'ingredients'
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.keys = []
+        self.items = {}
+        self.version = None
+        self.built = 0
+        self.enabled = False
+
+    def is_fresh(self):
+        return (self.version is not None
+                and time.monotonic() - self.built < self.max_age
+                and self.version == get_cache_version(self.namespace))
+
+    def rebuild(self):
+        version = get_cache_version(self.namespace)
+        built = time.monotonic()
+        with use_primary():
+            rows = list(Ingredient.objects.order_by().values_list(
+                'pk', 'name', 'measurement_unit'
+            )[:self.max_size + 1])
+        with self.lock:
+            self.version = version
+            self.built = built
+            self.enabled = len(rows) <= self.max_size
+            if not self.enabled:
+                self.keys, self.items = [], {}
+                return
+            self.items = {pk: (name, unit) for pk, name, unit in rows}
+            self.keys = sorted((name.lower(), pk) for pk, name, _ in rows)
+
+    def _discard(self, pk):
+        item = self.items.pop(pk, None)
+        if item is None:
+            return
+        index = bisect_left(self.keys, (item[0].lower(), pk))
+        del self.keys[index]
+
+    def add(self, ingredient, version):
+        with self.lock:
+            self._discard(ingredient.pk)
+            if len(self.items) >= self.max_size:
+                self.version = None
+                return
+            self.items[ingredient.pk] = (
+                ingredient.name, ingredient.measurement_unit
+            )
+            insort(self.keys, (ingredient.name.lower(), ingredient.pk))
+            self.version = version
+
+    def discard(self, pk, version):
+        with self.lock:
+            self._discard(pk)
+            self.version = version
+
+    def search(self, term):
+        """Return prefix matches, then substring matches.
+
+        Returns ``None`` when the table is too large to be indexed.
+        """
+        if not self.is_fresh():
+            self.rebuild()
+        term = term.lower()
+        with self.lock:
+            if not self.enabled:
+                return None
+            keys = self.keys
+            found = []
+            index = bisect_left(keys, (term,))
+            while index < len(keys) and keys[index][0].startswith(term):
+                found.append(keys[index][1])
+                index += 1
+            substring = []
+            for key, pk in keys:
+                position = key.find(term)
+                if position > 0:
+                    substring.append((position, key, pk))
+            substring.sort()
+            found.extend(pk for _, _, pk in substring)
+            return [
+                Ingredient(pk=pk, name=self.items[pk][0],
+                           measurement_unit=self.items[pk][1])
+                for pk in found
+            ]
+
+
+ingredient_index = IngredientIndex(
+    settings.INGREDIENT_INDEX_MAX_SIZE, settings.INGREDIENT_INDEX_MAX_AGE
+)
@@ -0,0 +1,254 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from foodgram.replicas import use_primary
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def after_commit(function):
+    """Run ``function`` once the current atomic block commits.
+
+    Cache invalidation must wait for the commit: a response rendered
+    from the old rows in between would be stored as fresh.
+    """
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(function)
+    else:
+        function()
+
+
+def get_cache_version(namespace):
+    """Return the time the namespace was last invalidated."""
+    key = f'api:{namespace}:version'
+    version = get_cache().get(key)
+    if version is None:
+        get_cache().add(key, time.time(), None)
+        version = get_cache().get(key)
+    return version
+
+
+def invalidate_cache(namespace):
+    """Drop every cached response of the namespace."""
+    version = time.time()
+    get_cache().set(f'api:{namespace}:version', version, None)
+    return version
+
+
+def get_tag_key(tag):
+    return f'api:tag:{tag}'
+
+
+def get_tag_versions(tags):
+    """Return the time each tag was last invalidated.
+
+    Tags that were never invalidated get version 0, so an entry whose tag
+    version is evicted from the cache later reads as stale.
+    """
+    keys = {get_tag_key(tag): tag for tag in tags}
+    versions = get_cache().get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            get_cache().add(key, 0, None)
+        versions.update(get_cache().get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(*tags):
+    """Drop every cached response tagged with one of ``tags``.
+
+    Runs when the current atomic block commits, so a response rendered
+    before the commit can never be stored under the new versions.
+    """
+
+    def invalidate():
+        version = time.time()
+        get_cache().set_many(
+            {get_tag_key(tag): version for tag in tags}, None
+        )
+
+    after_commit(invalidate)
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve from the rendered response cache.
+
+    Entries are keyed by the namespace version, the path and the sorted
+    query params, so a single ``invalidate_cache`` call makes all of them
+    stale at once.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self, request, version):
+        # The host is part of the key: paginated responses link to
+        # absolute URLs.
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        digest = hashlib.md5(
+            f'{request.build_absolute_uri(request.path)}?{params}'.encode()
+        ).hexdigest()
+        return f'api:{self.cache_namespace}:{version}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        version = get_cache_version(self.cache_namespace)
+        key = self.get_cache_key(request, version)
+        entry = get_cache().get(key)
+        if entry is None:
+            # A lagging replica would store stale data under a new version.
+            with use_primary():
+                response = handler(request, *args, **kwargs)
+            content = renderer.render(
+                response.data,
+                request.accepted_media_type,
+                self.get_renderer_context()
+            )
+            entry = (quote_etag(hashlib.md5(content).hexdigest()), content)
+            get_cache().set(key, entry, settings.API_CACHE_TIMEOUT)
+        etag, content = entry
+        response = HttpResponse(
+            content,
+            content_type=request.accepted_media_type
+        )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(version),
+            response=response
+        )
+
+
+class TaggedResponseMixin(CachedResponseMixin):
+    """Cache the anonymous list and retrieve responses with tags.
+
+    Each entry records the versions of the tags from ``get_cache_tags``
+    and is stale once one of them is bumped by ``invalidate_tags``, so a
+    change drops only the entries that contain the changed objects.
+    Authenticated users are served the anonymous entry with their own
+    fields filled in by ``personalize``.
+    """
+
+    cacheable_params = ()
+
+    def get_cache_tags(self, request, data):
+        raise NotImplementedError
+
+    def personalize(self, data, user):
+        raise NotImplementedError
+
+    def is_cacheable(self, request):
+        return (request.accepted_renderer.format == 'json'
+                and set(request.query_params) <= set(self.cacheable_params))
+
+    def get_fresh_entry(self, key):
+        entry = get_cache().get(key)
+        if entry is None:
+            return None
+        if get_tag_versions(entry['versions']) != entry['versions']:
+            return None
+        return entry
+
+    def build_entry(self, handler, request, *args, **kwargs):
+        user = request.user
+        request.user = AnonymousUser()
+        try:
+            with use_primary():
+                response = handler(request, *args, **kwargs)
+        finally:
+            request.user = user
+        if response.status_code != 200:
+            return None, response
+        content = request.accepted_renderer.render(
+            response.data,
+            request.accepted_media_type,
+            self.get_renderer_context()
+        )
+        versions = get_tag_versions(
+            self.get_cache_tags(request, response.data)
+        )
+        entry = {
+            'data': response.data,
+            'content': content,
+            'etag': quote_etag(hashlib.md5(content).hexdigest()),
+            'versions': versions,
+        }
+        return entry, None
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+        version = get_cache_version(self.cache_namespace)
+        key = self.get_cache_key(request, version)
+        entry = self.get_fresh_entry(key)
+        if entry is None:
+            started = time.time()
+            entry, response = self.build_entry(
+                handler, request, *args, **kwargs
+            )
+            if entry is None:
+                return response
+            # A tag invalidated while the response was being built may
+            # not be reflected in it.
+            if max(entry['versions'].values(), default=0) <= started:
+                get_cache().set(key, entry, settings.API_CACHE_TIMEOUT)
+        if request.user.is_authenticated:
+            return self.personalized_response(request, entry)
+        last_modified = max(version, *entry['versions'].values())
+        response = HttpResponse(
+            entry['content'],
+            content_type=request.accepted_media_type
+        )
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(last_modified)
+        return get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=int(last_modified),
+            response=response
+        )
+
+    def personalized_response(self, request, entry):
+        # User fields change without touching the tags, so there is no
+        # Last-Modified to send, only the ETag of the content.
+        data = entry['data']
+        self.personalize(data, request.user)
+        content = request.accepted_renderer.render(
+            data,
+            request.accepted_media_type,
+            self.get_renderer_context()
+        )
+        etag = quote_etag(hashlib.md5(content).hexdigest())
+        response = HttpResponse(
+            content,
+            content_type=request.accepted_media_type
+        )
+        response['ETag'] = etag
+        return get_conditional_response(
+            request, etag=etag, response=response
+        )
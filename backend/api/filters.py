@@ -1,7 +1,15 @@
-from django_filters import FilterSet, ModelMultipleChoiceFilter, NumberFilter
+from django_filters import (
+    CharFilter, ChoiceFilter, FilterSet, ModelMultipleChoiceFilter,
+    NumberFilter,
+)
 from rest_framework.filters import SearchFilter
 
+from django.db.models import F
+
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
+
+from .autocomplete import ingredient_index
 
 
 class RecipeFilter(FilterSet):
@@ -15,10 +23,28 @@ class RecipeFilter(FilterSet):
     is_favorited = NumberFilter(method='get_is_favorited')
     is_in_shopping_cart = NumberFilter(
         method='get_is_in_shopping_cart')
+    search = CharFilter(method='get_search')
+    ordering = ChoiceFilter(
+        choices=(
+            ('popular', 'popular'),
+            ('trending', 'trending'),
+            ('cooking_time', 'cooking_time'),
+        ),
+        method='get_ordering',
+    )
+
+    ORDERINGS = {
+        'popular': ('-favorites_count', '-pub_date', '-id'),
+        'trending': (
+            F('score__trending').desc(nulls_last=True), '-pub_date', '-id'
+        ),
+        'cooking_time': ('cooking_time', '-pub_date', '-id'),
+    }
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering']
 
     def get_is_favorited(self, queryset, name, value):
         if value:
@@ -30,6 +56,15 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user.id)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        value = value.strip()
+        if value:
+            return search_recipes(queryset, value)
+        return queryset
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
+
 
 class IngredientFilter(SearchFilter):
     """Filter ingredient by name."""
@@ -39,3 +74,12 @@ class IngredientFilter(SearchFilter):
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param, '').strip()
+        # The index returns a list, which retrieve cannot look up in.
+        if name and view.action == 'list':
+            ingredients = ingredient_index.search(name)
+            if ingredients is not None:
+                return ingredients
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from rest_framework import serializers
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists collapsed, to spot repeated queries."""
+    return IN_LISTS.sub('(...)', LITERALS.sub('?', sql))
+
+
+class RequestMetrics:
+    """What a single request spent its time on."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries[fingerprint(sql)] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    def duplicates(self):
+        threshold = settings.INSTRUMENTATION_DUPLICATE_THRESHOLD
+        return {
+            sql: count for sql, count in self.queries.items()
+            if count >= threshold
+        }
+
+
+def timed_data(data):
+    """Wrap ``Serializer.data`` to add its time to the current request."""
+
+    def wrapper(self):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return data.fget(self)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializing = False
+
+    return property(wrapper)
+
+
+def instrument_serializers():
+    for serializer in (serializers.Serializer, serializers.ListSerializer):
+        data = serializer.__dict__['data']
+        if not getattr(data.fget, 'instrumented', False):
+            serializer.data = timed_data(data)
+            serializer.data.fget.instrumented = True
+
+
+class MetricsRegistry:
+    """In-process counters rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.buckets = defaultdict(int)
+
+    def observe(self, view, method, status, metrics, total, size):
+        labels = f'view="{view}",method="{method}"'
+        with self.lock:
+            self.counters[
+                ('requests_total', f'{labels},status="{status}"')
+            ] += 1
+            for name, value in (
+                ('request_duration_seconds_sum', total),
+                ('db_queries_total', metrics.query_count),
+                ('db_duration_seconds_sum', metrics.db_time),
+                ('serializer_duration_seconds_sum', metrics.serializer_time),
+                ('response_bytes_total', size or 0),
+                ('duplicate_queries_total', len(metrics.duplicates())),
+            ):
+                self.counters[(name, labels)] += value
+            for bound in DURATION_BUCKETS:
+                if total <= bound:
+                    self.buckets[(labels, bound)] += 1
+            self.buckets[(labels, '+Inf')] += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f'foodgram_{name}{{{labels}}} {value:g}')
+            for (labels, bound), value in sorted(
+                self.buckets.items(), key=lambda item: (
+                    item[0][0], float(item[0][1])
+                )
+            ):
+                lines.append(
+                    f'foodgram_request_duration_seconds_bucket'
+                    f'{{{labels},le="{bound}"}} {value}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """Report query count, DB, serializer and total time of each request.
+
+    Enabled by ``INSTRUMENTATION_ENABLED``; otherwise Django drops the
+    middleware at startup. Under ASGI the queries of async views are
+    counted by ``database_sync_to_async``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        instrument_serializers()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.query_count} queries"',
+            f'serialize;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        self.log(request, response, metrics, total, size)
+        match = request.resolver_match
+        registry.observe(
+            match.view_name if match else 'unresolved',
+            request.method, response.status_code, metrics, total, size
+        )
+        return response
+
+    def log(self, request, response, metrics, total, size):
+        duplicates = metrics.duplicates()
+        logger.log(
+            logging.WARNING if duplicates else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': metrics.query_count,
+                'db_ms': round(metrics.db_time * 1000, 2),
+                'serializer_ms': round(metrics.serializer_time * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+                'bytes': size,
+                'duplicate_queries': [
+                    {'sql': sql, 'count': count}
+                    for sql, count in duplicates.items()
+                ],
+            }, ensure_ascii=False)
+        )
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for the counters of this process."""
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,178 @@
+import json
+import statistics
+import time
+from itertools import combinations
+
+from rest_framework.authtoken.models import Token
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.filters import RecipeFilter
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(timings, value):
+    """Nearest-rank percentile of sorted timings."""
+    index = max(round(value / 100 * len(timings)) - 1, 0)
+    return timings[min(index, len(timings) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Time the main API endpoints through the test client and count '
+            'their SQL queries. Run generate_data first for a realistic '
+            'dataset.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--user', help='Email of the requesting user; '
+                                           'the most active one by default.')
+        parser.add_argument(
+            '--max-filters', type=int, default=2,
+            help='Benchmark every combination of up to this many recipe '
+                 'filters.'
+        )
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument('--compare',
+                            help='JSON results of a previous run to diff.')
+
+    def get_user(self, email):
+        users = CustomUser.objects.order_by('-recipes_count', 'id')
+        user = users.filter(email=email).first() if email else users.first()
+        if user is None:
+            raise CommandError('No users, run generate_data first')
+        return user
+
+    def get_filter_values(self, user):
+        tag = Tag.objects.first()
+        author = CustomUser.objects.order_by('-recipes_count').first()
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        return {
+            'tags': tag.slug if tag else None,
+            'author': author.id if author else None,
+            'is_favorited': 1,
+            'is_in_shopping_cart': 1,
+            'search': recipe.name.split()[0] if recipe else None,
+            'ordering': 'popular',
+        }
+
+    def get_endpoints(self, user, max_filters):
+        values = self.get_filter_values(user)
+        filters = [
+            name for name in RecipeFilter.base_filters
+            if values.get(name) is not None
+        ]
+        endpoints = {'recipes': '/api/recipes/'}
+        for size in range(1, max_filters + 1):
+            for names in combinations(filters, size):
+                query = '&'.join(f'{name}={values[name]}' for name in names)
+                endpoints[f'recipes?{"&".join(names)}'] = (
+                    f'/api/recipes/?{query}'
+                )
+        endpoints['recipes?cursor'] = '/api/recipes/?cursor='
+        recipe = Recipe.objects.annotate(
+            size=Count('recipe_ingredient')
+        ).order_by('-size').first()
+        if recipe is not None:
+            endpoints['recipes/<id>'] = f'/api/recipes/{recipe.id}/'
+        endpoints['feed'] = '/api/recipes/feed/'
+        endpoints['subscriptions'] = (
+            '/api/users/subscriptions/?recipes_limit=3'
+        )
+        endpoints['download_shopping_cart'] = (
+            '/api/recipes/download_shopping_cart/'
+        )
+        ingredient = Ingredient.objects.order_by('name').first()
+        if ingredient is not None:
+            endpoints['ingredients?name'] = (
+                f'/api/ingredients/?name={ingredient.name[:2]}'
+            )
+        return endpoints
+
+    def request(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response.status_code, elapsed, len(queries), size
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+        timings, query_counts = [], []
+        for _ in range(iterations):
+            status, elapsed, queries, size = self.request(client, url)
+            timings.append(elapsed)
+            query_counts.append(queries)
+        timings.sort()
+        result = {
+            'url': url,
+            'status': status,
+            'bytes': size,
+            'queries': max(query_counts),
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        for value in PERCENTILES:
+            result[f'p{value}_ms'] = round(percentile(timings, value), 3)
+        return result
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        endpoints = self.get_endpoints(user, options['max_filters'])
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            for name, url in endpoints.items():
+                results[name] = self.measure(
+                    client, url, options['iterations'], options['warmup']
+                )
+                self.report(name, results[name])
+        report = {
+            'database': connection.vendor,
+            'user': user.email,
+            'iterations': options['iterations'],
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                self.compare(json.load(file)['endpoints'], results)
+
+    def report(self, name, result):
+        style = (self.style.SUCCESS if result['status'] == 200
+                 else self.style.ERROR)
+        self.stdout.write(style(
+            f'{name}: {result["status"]}, {result["queries"]} queries, '
+            f'p50 {result["p50_ms"]:.1f} ms, p95 {result["p95_ms"]:.1f} ms, '
+            f'{result["bytes"]} bytes'
+        ))
+
+    def compare(self, previous, results):
+        self.stdout.write('Change against the previous run:')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = (result['p50_ms'] - before['p50_ms']) / max(
+                before['p50_ms'], 1e-6) * 100
+            self.stdout.write(
+                f'{name}: p50 {change:+.0f}%, queries '
+                f'{before["queries"]} -> {result["queries"]}'
+            )
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+from rest_framework.authtoken.models import Token
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Recipe
+from users.models import CustomUser
+
+from .benchmark_api import PERCENTILES, percentile
+
+CONNECTION_ERRORS = (
+    OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError,
+    IndexError,
+)
+
+
+class Results:
+    """Timings and outcomes of one benchmark run."""
+
+    def __init__(self):
+        self.timings = []
+        self.statuses = Counter()
+        self.errors = 0
+
+
+class Command(BaseCommand):
+    help = ('Load running servers with many concurrent keep-alive '
+            'connections and compare throughput and latency. Start the '
+            'sync mode with "gunicorn foodgram.wsgi" and the async one with '
+            '"ASYNC_READ_VIEWS=True uvicorn foodgram.asgi:application", '
+            'then pass both as --target.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='name=base URL, for example sync=http://127.0.0.1:8000'
+        )
+        parser.add_argument('--connections', type=int, nargs='+',
+                            default=[10, 100, 500])
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Seconds per target and connection count.')
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Extra connections that trickle their requests in over '
+                 '--slow-seconds, like clients on a bad network.'
+        )
+        parser.add_argument('--slow-seconds', type=float, default=5)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--user', help='Email of the requesting user; '
+                                           'the most active one by default.')
+        parser.add_argument('--output', help='Write the results as JSON.')
+
+    def get_paths(self, user):
+        paths = ['/api/recipes/', '/api/tags/']
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        if recipe is not None:
+            paths.append(f'/api/recipes/{recipe.pk}/')
+        ingredient = Ingredient.objects.order_by('name').first()
+        if ingredient is not None:
+            paths.append(
+                f'/api/ingredients/?name={quote(ingredient.name[:2])}'
+            )
+        if user is not None:
+            paths.append('/api/users/subscriptions/?recipes_limit=3')
+        return paths
+
+    def get_headers(self, user):
+        if user is None:
+            return ''
+        token, _ = Token.objects.get_or_create(user=user)
+        return f'Authorization: Token {token.key}\r\n'
+
+    async def request(self, reader, writer, path):
+        """Send a GET and read the whole response.
+
+        Returns the status and whether the server closes the connection.
+        """
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+            f'{self.headers}\r\n'.encode()
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value
+            elif name == 'connection':
+                close = value == 'close'
+        if chunked:
+            size = None
+            while size != 0:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+        elif length is not None:
+            await reader.readexactly(length)
+        else:
+            await reader.read()
+            close = True
+        return status, close
+
+    async def client(self, paths, deadline, results):
+        writer = None
+        index = random.randrange(len(paths))
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                status, close = await asyncio.wait_for(
+                    self.request(reader, writer, path), self.timeout
+                )
+            except CONNECTION_ERRORS:
+                results.errors += 1
+                close = True
+            else:
+                results.timings.append((time.perf_counter() - start) * 1000)
+                results.statuses[status] += 1
+            if close and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    async def slow_client(self, path, deadline):
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+            f'Connection: close\r\n{self.headers}\r\n'
+        ).encode()
+        delay = self.slow_seconds / len(request)
+        while time.perf_counter() < deadline:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port
+                )
+                for index in range(len(request)):
+                    writer.write(request[index:index + 1])
+                    await writer.drain()
+                    await asyncio.sleep(delay)
+                await asyncio.wait_for(reader.read(), self.timeout)
+                writer.close()
+            except CONNECTION_ERRORS:
+                await asyncio.sleep(delay)
+
+    async def run(self, paths, connections, duration):
+        results = Results()
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(self.client(paths, deadline, results)
+              for _ in range(connections)),
+            *(self.slow_client(paths[0], deadline)
+              for _ in range(self.slow_clients)),
+        )
+        return results
+
+    def summarize(self, results, duration):
+        timings = sorted(results.timings)
+        summary = {
+            'requests': len(timings),
+            'rps': round(len(timings) / duration, 1),
+            'errors': results.errors,
+            'statuses': dict(results.statuses),
+        }
+        for value in PERCENTILES:
+            summary[f'p{value}_ms'] = (
+                round(percentile(timings, value), 1) if timings else None
+            )
+        return summary
+
+    def parse_target(self, target):
+        name, _, url = target.partition('=')
+        parts = urlsplit(url)
+        if not name or not parts.hostname:
+            raise CommandError(f'Expected name=http://host:port, got {target}')
+        return name, parts.hostname, parts.port or 80
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('-recipes_count', 'id')
+        user = (users.filter(email=options['user']).first()
+                if options['user'] else users.first())
+        paths = self.get_paths(user)
+        self.headers = self.get_headers(user)
+        self.timeout = options['timeout']
+        self.slow_clients = options['slow_clients']
+        self.slow_seconds = options['slow_seconds']
+        report = {}
+        for target in options['target']:
+            name, self.host, self.port = self.parse_target(target)
+            report[name] = {}
+            for connections in options['connections']:
+                results = asyncio.run(
+                    self.run(paths, connections, options['duration'])
+                )
+                summary = self.summarize(results, options['duration'])
+                report[name][connections] = summary
+                self.stdout.write(
+                    f'{name}, {connections} connections: '
+                    f'{summary["rps"]} req/s, p50 {summary["p50_ms"]} ms, '
+                    f'p99 {summary["p99_ms"]} ms, '
+                    f'{summary["errors"]} errors, {summary["statuses"]}'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
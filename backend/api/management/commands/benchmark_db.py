@@ -0,0 +1,88 @@
+import json
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from .benchmark_api import PERCENTILES, percentile
+
+MODES = {
+    'new': {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL_SIZE': 0,
+    },
+    'persistent': {
+        'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True, 'POOL_SIZE': 0,
+    },
+    'pooled': {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'POOL_SIZE': 4,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ('Time the database side of a request cycle with a new '
+            'connection per request, a persistent connection and the '
+            'connection pool.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--query', default='SELECT 1',
+                            help='Query run once per simulated request.')
+        parser.add_argument('--output', help='Write the results as JSON.')
+
+    def cycle(self, query):
+        """One request: start signal, a query, finish signal."""
+        start = time.perf_counter()
+        request_started.send(sender=self.__class__)
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            cursor.fetchall()
+        pid = connection.connection.get_backend_pid()
+        request_finished.send(sender=self.__class__)
+        return (time.perf_counter() - start) * 1000, pid
+
+    def measure(self, mode, options):
+        saved = {key: connection.settings_dict.get(key) for key in mode}
+        connection.close()
+        connection.settings_dict.update(mode)
+        try:
+            self.cycle(options['query'])
+            timings, pids = [], set()
+            for _ in range(options['iterations']):
+                elapsed, pid = self.cycle(options['query'])
+                timings.append(elapsed)
+                pids.add(pid)
+        finally:
+            connection.close()
+            connection.settings_dict.update(saved)
+        timings.sort()
+        result = {
+            'connections': len(pids),
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        for value in PERCENTILES:
+            result[f'p{value}_ms'] = round(percentile(timings, value), 3)
+        return result
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The benchmark needs PostgreSQL')
+        results = {}
+        for name, mode in MODES.items():
+            if mode['POOL_SIZE'] and not hasattr(connection, 'pool'):
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: skipped, the database engine has no pool'
+                ))
+                continue
+            results[name] = result = self.measure(mode, options)
+            self.stdout.write(
+                f'{name}: {result["connections"]} connections, '
+                f'mean {result["mean_ms"]:.2f} ms, '
+                f'p50 {result["p50_ms"]:.2f} ms, '
+                f'p95 {result["p95_ms"]:.2f} ms'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,55 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand
+
+from api.autocomplete import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Compare ingredient autocomplete in the index and in the DB.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--prefix-length', type=int, default=2)
+
+    def measure(self, search, terms, rounds):
+        timings = []
+        for _ in range(rounds):
+            for term in terms:
+                start = time.perf_counter()
+                search(term)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return (statistics.mean(timings),
+                timings[len(timings) // 2],
+                timings[int(len(timings) * 0.95)])
+
+    def handle(self, *args, **options):
+        length = options['prefix_length']
+        terms = sorted({
+            name[:length] for name in
+            Ingredient.objects.values_list('name', flat=True)
+            if len(name) >= length
+        })
+        if not terms:
+            self.stdout.write(self.style.WARNING('No ingredients loaded'))
+            return
+        ingredient_index.rebuild()
+        results = {
+            'db': self.measure(
+                lambda term: list(Ingredient.objects.filter(
+                    name__istartswith=term)),
+                terms, options['rounds']
+            ),
+            'index': self.measure(
+                ingredient_index.search, terms, options['rounds']
+            ),
+        }
+        self.stdout.write(f'{len(terms)} terms x {options["rounds"]} rounds')
+        for name, (mean, median, p95) in results.items():
+            self.stdout.write(
+                f'{name:>6}: mean {mean:.3f} ms, '
+                f'p50 {median:.3f} ms, p95 {p95:.3f} ms'
+            )
@@ -0,0 +1,102 @@
+import re
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from django.core.management import BaseCommand, CommandError
+
+from api.views import CustomUserViewSet, IngredientViewSet, RecipeViewSet
+from recipes.models import Tag
+from users.models import CustomUser
+
+SEQUENTIAL_SCANS = (
+    # PostgreSQL
+    re.compile(r'Seq Scan on (\w+)'),
+    # SQLite rows start with id, parent and notused; a scan that walks an
+    # index is not sequential.
+    re.compile(r'^\d+ \d+ \d+ SCAN (?:TABLE )?(\w+)\b(?! USING)', re.M),
+)
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the main API queries and report sequential scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the requesting user.')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print the full query plans.')
+
+    def get_user(self, email):
+        users = CustomUser.objects.order_by('id')
+        user = users.filter(email=email).first() if email else users.first()
+        if user is None:
+            raise CommandError('No user to run the queries for')
+        return user
+
+    def build_request(self, user, params=None):
+        request = APIRequestFactory().get('/', params or {})
+        force_authenticate(request, user=user)
+        return request
+
+    def get_view(self, viewset, action, user, params=None):
+        view = viewset(action_map={'get': action}, format_kwarg=None,
+                       args=(), kwargs={})
+        view.request = view.initialize_request(
+            self.build_request(user, params)
+        )
+        return view
+
+    def recipe_list(self, user, params=None):
+        view = self.get_view(RecipeViewSet, 'list', user, params)
+        page_size = view.paginator.get_page_size(view.request)
+        return view.filter_queryset(view.get_queryset())[:page_size]
+
+    def get_queries(self, user):
+        tag = Tag.objects.first()
+        queries = {
+            'recipes': self.recipe_list(user),
+            'recipes?author': self.recipe_list(user, {'author': user.id}),
+            'recipes?is_favorited': self.recipe_list(
+                user, {'is_favorited': 1}),
+            'recipes?is_in_shopping_cart': self.recipe_list(
+                user, {'is_in_shopping_cart': 1}),
+            'recipes?search': self.recipe_list(user, {'search': 'суп'}),
+        }
+        if tag is not None:
+            queries['recipes?tags'] = self.recipe_list(
+                user, {'tags': tag.slug})
+        view = self.get_view(RecipeViewSet, 'download_shopping_cart', user)
+        queries['download_shopping_cart'] = (
+            view.get_shopping_cart_ingredients(user)
+        )
+        view = self.get_view(CustomUserViewSet, 'subscriptions', user,
+                             {'recipes_limit': 3})
+        queries['subscriptions'] = view.get_subscriptions_queryset(
+            view.request)[:view.paginator.get_page_size(view.request)]
+        view = self.get_view(IngredientViewSet, 'list', user)
+        queries['ingredients?name'] = view.get_queryset().filter(
+            name__istartswith='мо')
+        return queries
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        found = False
+        for name, queryset in self.get_queries(user).items():
+            plan = queryset.explain()
+            tables = sorted({
+                table for pattern in SEQUENTIAL_SCANS
+                for table in pattern.findall(plan)
+            })
+            if tables:
+                found = True
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: sequential scan on {", ".join(tables)}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+        if found:
+            self.stdout.write(
+                'Small tables are often scanned sequentially on purpose; '
+                're-check on a production-sized dataset.'
+            )
@@ -1,5 +1,158 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    BasePagination, PageNumberPagination, _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a fixed tuple of ordering fields.
+
+    The cursor holds the ordering values of the last row of the page, so
+    every page is a single range scan no matter how deep it is.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering, model):
+        self.ordering = ordering
+        self.model = model
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, position):
+        position = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(position).encode()
+        ).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                self.parse_value(field, value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_value(self, field, value):
+        """Convert a cursor value to the type of its model field."""
+        if value is None:
+            raise ValueError('Cursor values cannot be null.')
+        field = self.model._meta.get_field(field.lstrip('-'))
+        return field.to_python(value)
+
+    def get_position_filter(self, position):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{field.lstrip("-")}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        results = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [
+                getattr(results[-1], field.lstrip('-'))
+                for field in self.ordering
+            ]
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
 
 
 class LimitPagination(PageNumberPagination):
+    """Page number pagination with an opt-in keyset mode.
+
+    Passing ``?cursor=`` switches views that define ``keyset_ordering``
+    to ``KeysetPagination``. The keyset order is fixed, so a cursor
+    cannot be combined with ``?ordering=``.
+    """
+
     page_size_query_param = 'limit'
+    ordering_query_param = 'ordering'
+    keyset_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (self.keyset_ordering is not None
+                and KeysetPagination.cursor_query_param
+                in request.query_params):
+            if request.query_params.get(self.ordering_query_param):
+                raise ValidationError({self.ordering_query_param: [
+                    'Ordering cannot be combined with a cursor.'
+                ]})
+            self.keyset = KeysetPagination(self.keyset_ordering,
+                                           queryset.model)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(LimitPagination):
+    keyset_ordering = ('-pub_date', '-id')
+
+
+class SubscriptionPagination(LimitPagination):
+    keyset_ordering = ('id',)
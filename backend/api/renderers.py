@@ -0,0 +1,61 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class EchoBuffer:
+    """File-like object that returns written value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartTextRenderer(BaseRenderer):
+    """Shopping cart text renderer."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode(self.charset)
+
+    def stream(self, ingredients):
+        yield 'Shopping list\n\n'
+        for i, (name, unit, amount) in enumerate(ingredients, start=1):
+            yield f'{i}. {name} – {amount} {unit}\n'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartTextRenderer):
+    """Shopping cart csv renderer."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in ingredients:
+            yield writer.writerow(row)
+
+
+class ShoppingCartJSONRenderer(JSONRenderer):
+    """Shopping cart json renderer."""
+
+    charset = 'utf-8'
+
+    def stream(self, ingredients):
+        yield '['
+        for i, (name, unit, amount) in enumerate(ingredients):
+            item = json.dumps({
+                'name': name,
+                'measurement_unit': unit,
+                'amount': amount,
+            }, ensure_ascii=False)
+            yield item if i == 0 else f', {item}'
+        yield ']'
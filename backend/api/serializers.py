@@ -1,16 +1,24 @@
 import base64
+import binascii
 
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import _positive_int
 from rest_framework.validators import UniqueTogetherValidator
 
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
-from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
 
+from recipes.images import open_image
 from recipes.models import (
     Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag,
 )
+from recipes.tasks import build_image_variants, refresh_search_vector
+from taskqueue.queue import defer
 from users.models import CustomUser, Follow
 
 
@@ -55,6 +63,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return False if (request is None or request.user.is_anonymous) \
             else Follow.objects.filter(
@@ -79,6 +89,19 @@ class ChangePasswordSerializer(serializers.ModelSerializer):
         return value
 
 
+def get_recipes_limit(request):
+    """Parse ``?recipes_limit=``, ``None`` when it is not given."""
+    value = request.query_params.get('recipes_limit')
+    if value is None:
+        return None
+    try:
+        return _positive_int(value)
+    except ValueError:
+        raise ValidationError({
+            'recipes_limit': ['A non-negative integer is required.']
+        })
+
+
 class FollowSerializer(serializers.ModelSerializer):
     """Follow сreate Serializer."""
 
@@ -112,12 +135,15 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        limit_recipes = request.query_params.get('recipes_limit')
-        recipe = Recipe.objects.filter(author=obj.following)
-        if limit_recipes is not None:
-            recipes = recipe.all()[:(int(limit_recipes))]
+        if hasattr(obj.following, 'recipes_preview'):
+            recipes = obj.following.recipes_preview
         else:
-            recipes = recipe.all()
+            limit_recipes = get_recipes_limit(request)
+            recipe = Recipe.objects.filter(author=obj.following)
+            if limit_recipes is not None:
+                recipes = recipe.all()[:limit_recipes]
+            else:
+                recipes = recipe.all()
         context = {'request': request}
         return RecipeInfoSerializer(
             recipes,
@@ -125,6 +151,8 @@ class FollowSerializer(serializers.ModelSerializer):
             context=context).data
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         if not obj.following:
             return False
         return Follow.objects.filter(
@@ -134,21 +162,74 @@ class FollowSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def get_recipes_count(obj):
-        return Recipe.objects.filter(author=obj.following).count()
+        return obj.following.recipes_count
 
 
 class Base64ImageField(serializers.ImageField):
-    """Convert ing to base64."""
+    """Convert ing to base64.
 
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+    The payload is decoded in chunks into a temporary file after checking
+    that the decoded size fits into ``IMAGE_MAX_UPLOAD_SIZE``.
+    """
+
+    chunk_size = 64 * 1024
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    default_error_messages = {
+        'max_size': 'Image must not exceed {max_size} bytes.',
+        'max_pixels': 'Image must not exceed {max_pixels} pixels.',
+    }
 
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            data = self.decode(data)
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        try:
+            format, imgstr = data.split(';base64,')
+        except ValueError:
+            self.fail('invalid')
+        ext = format.split('/')[-1]
+        size = len(imgstr) * 3 // 4 - imgstr[-2:].count('=')
+        if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            self.fail('max_size', max_size=settings.IMAGE_MAX_UPLOAD_SIZE)
+        file = TemporaryUploadedFile(
+            'temp.' + ext, format[len('data:'):], size, None
+        )
+        try:
+            for start in range(0, len(imgstr), self.chunk_size):
+                file.write(base64.b64decode(
+                    imgstr[start:start + self.chunk_size]
+                ))
+            file.seek(0)
+            open_image(file)
+        except binascii.Error:
+            self.fail('invalid')
+        except ValueError:
+            self.fail('max_pixels', max_pixels=settings.IMAGE_MAX_PIXELS)
+        except OSError:
+            self.fail('invalid_image')
+        file.seek(0)
+        return file
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the resized copies of the image, if already built."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for variant, names in value.items():
+            urls[variant] = {}
+            for extension, name in names.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[variant][extension] = url
+        return urls
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Tag serialize."""
@@ -224,38 +305,86 @@ class RecipeSerializer(serializers.ModelSerializer):
             'id'
         )
 
+    def validate_ingredients(self, value):
+        ingredient_ids = [ingredient['id'] for ingredient in value]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise ValidationError('Ingredients must not be repeated.')
+        existing = Ingredient.objects.in_bulk(ingredient_ids)
+        missing = [pk for pk in ingredient_ids if pk not in existing]
+        if missing:
+            raise ValidationError(f'Ingredients do not exist: {missing}')
+        return value
+
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredient_id=ingredient.get('id'),
                 amount=ingredient.get('amount'),
-            )
+            ) for ingredient in ingredients
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredient.all()
+        }
+        amounts = {
+            ingredient.get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        changed = []
+        for ingredient_id, recipe_ingredient in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        RecipeIngredient.objects.filter(recipe=recipe).exclude(
+            ingredient_id__in=amounts
+        ).delete()
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        self.create_ingredients(
+            (ingredient for ingredient in ingredients
+             if ingredient.get('id') not in current),
+            recipe
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         image = validated_data.pop('image')
         ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(image=image, **validated_data)
-        print(validated_data)
+        image.close()
         tags_data = self.initial_data.get('tags')
         recipe.tags.set(tags_data)
         self.create_ingredients(ingredients_data, recipe)
+        defer(refresh_search_vector, recipe_ids=[recipe.pk])
+        defer(build_image_variants, recipe_id=recipe.pk,
+              name=recipe.image.name)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
+        image = validated_data.get('image')
+        if image is not None:
+            instance.image = image
+            instance.image_variants = {}
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
-        instance.tags.clear()
         tags_data = self.initial_data.get('tags')
         instance.tags.set(tags_data)
-        RecipeIngredient.objects.filter(recipe=instance).all().delete()
-        print(validated_data)
-        self.create_ingredients(validated_data.get('ingredients'), instance)
+        ingredients_data = validated_data.get('ingredients')
+        if ingredients_data is not None:
+            self.update_ingredients(ingredients_data, instance)
         instance.save()
+        defer(refresh_search_vector, recipe_ids=[instance.pk])
+        if image is not None:
+            image.close()
+            defer(build_image_variants, recipe_id=instance.pk,
+                  name=instance.image.name)
         return instance
 
     def to_representation(self, instance):
@@ -271,6 +400,7 @@ class GetRecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True, many=False)
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
 
@@ -285,17 +415,27 @@ class GetRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return Favorite.objects.filter(user=user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -346,8 +486,19 @@ class RecipeInfoSerializer(serializers.ModelSerializer):
     """Info Serializer."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = 'id', 'name', 'image', 'cooking_time'
+        fields = 'id', 'name', 'image', 'image_variants', 'cooking_time'
         read_only_fields = ('__all__',)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Ids of a batch request."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE
+    )
@@ -0,0 +1,103 @@
+from rest_framework.authtoken.models import Token
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import image_variants_built
+from recipes.tasks import refresh_search_vector
+from taskqueue.queue import defer
+from users.models import CustomUser
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .autocomplete import ingredient_index
+from .cache import after_commit, invalidate_cache, invalidate_tags
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_cache(instance, **kwargs):
+    after_commit(lambda: invalidate_cache('tags'))
+    invalidate_tags(f'tag:{instance.pk}')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    if created:
+        invalidate_tags('recipes', f'recipes:author:{instance.author_id}')
+    else:
+        invalidate_tags(f'recipe:{instance.pk}')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    invalidate_tags('recipes', f'recipes:author:{instance.author_id}',
+                    f'recipe:{instance.pk}')
+
+
+@receiver(image_variants_built, sender=Recipe)
+def recipe_image_variants_built(recipe_id, **kwargs):
+    invalidate_tags(f'recipe:{recipe_id}')
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    invalidate_tags(f'recipe:{instance.recipe_id}')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # Tag filters change which recipes the lists hold.
+    if not reverse:
+        invalidate_tags('recipes', f'recipes:author:{instance.author_id}',
+                        f'recipe:{instance.pk}')
+        return
+    tags = {'recipes', f'tag:{instance.pk}'}
+    if pk_set:
+        for pk, author_id in Recipe.objects.filter(
+                pk__in=pk_set).values_list('pk', 'author_id'):
+            tags.update((f'recipe:{pk}', f'recipes:author:{author_id}'))
+    invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(instance, created, **kwargs):
+    def invalidate():
+        fresh = ingredient_index.is_fresh()
+        version = invalidate_cache('ingredients')
+        if fresh:
+            ingredient_index.add(instance, version)
+        if not created:
+            # Recipes embed the ingredient names; renames are rare enough
+            # to drop all of them.
+            invalidate_cache('recipes')
+
+    after_commit(invalidate)
+    if not created:
+        defer(refresh_search_vector, ingredient_id=instance.pk)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(instance, **kwargs):
+    def invalidate():
+        fresh = ingredient_index.is_fresh()
+        version = invalidate_cache('ingredients')
+        if fresh:
+            ingredient_index.discard(instance.pk, version)
+
+    after_commit(invalidate)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    # Covers djoser logout, which deletes the user's tokens.
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    invalidate_user_tokens(instance)
+    invalidate_tags(f'author:{instance.pk}')
@@ -0,0 +1,37 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import get_cache
+from users.models import CustomUser
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    get_cache().clear()
+
+
+@pytest.fixture
+def user():
+    return CustomUser.objects.create_user(
+        username='reader', email='reader@example.com', password='pass',
+        first_name='Reader', last_name='Reader',
+    )
+
+
+@pytest.fixture
+def author():
+    return CustomUser.objects.create_user(
+        username='author', email='author@example.com', password='pass',
+        first_name='Author', last_name='Author',
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    # Warm up the token cache so only the view's queries are counted.
+    client.get('/api/users/me/')
+    return client
@@ -0,0 +1,81 @@
+import pytest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Follow
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def recipes(author):
+    return [
+        Recipe.objects.create(
+            author=author, name=f'Recipe {number}', text='Text',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+        for number in range(3)
+    ]
+
+
+def statuses(response):
+    return [(item['id'], item['status']) for item in response.json()[
+        'results']]
+
+
+@pytest.mark.parametrize('url, model, counter', (
+    ('/api/recipes/favorite/', Favorite, 'favorites_count'),
+    ('/api/recipes/shopping_cart/', ShoppingCart, 'in_carts_count'),
+))
+def test_batch_add_and_delete(user, user_client, recipes, url, model,
+                              counter):
+    first, second, third = (recipe.pk for recipe in recipes)
+    model.objects.create(user=user, recipe_id=first)
+
+    response = user_client.post(
+        url, {'ids': [first, second, second, 999]}, format='json')
+    assert response.status_code == 200
+    assert statuses(response) == [(first, 400), (second, 201), (999, 404)]
+    assert set(model.objects.filter(user=user).values_list(
+        'recipe_id', flat=True)) == {first, second}
+    counts = dict(Recipe.objects.values_list('pk', counter))
+    assert counts == {first: 1, second: 1, third: 0}
+
+    response = user_client.delete(
+        url, {'ids': [second, third, second]}, format='json')
+    assert response.status_code == 200
+    assert statuses(response) == [(second, 204), (third, 400)]
+    assert list(model.objects.values_list('recipe_id', flat=True)) == [
+        first]
+    counts = dict(Recipe.objects.values_list('pk', counter))
+    assert counts == {first: 1, second: 0, third: 0}
+
+
+def test_batch_subscribe_and_unsubscribe(user, author, user_client):
+    other = CustomUser.objects.create_user(
+        username='other', email='other@example.com', password='pass')
+    Follow.objects.create(follower=user, following=other)
+
+    response = user_client.post(
+        '/api/users/subscribe/',
+        {'ids': [author.pk, author.pk, other.pk, user.pk, 999]},
+        format='json')
+    assert response.status_code == 200
+    assert statuses(response) == [
+        (author.pk, 201), (other.pk, 400), (user.pk, 400), (999, 404)]
+    counts = dict(CustomUser.objects.values_list('pk', 'followers_count'))
+    assert counts == {user.pk: 0, author.pk: 1, other.pk: 1}
+    assert CustomUser.objects.get(pk=user.pk).following_count == 2
+
+    response = user_client.delete(
+        '/api/users/subscribe/', {'ids': [author.pk, 999]}, format='json')
+    assert statuses(response) == [(author.pk, 204), (999, 400)]
+    counts = dict(CustomUser.objects.values_list('pk', 'followers_count'))
+    assert counts == {user.pk: 0, author.pk: 0, other.pk: 1}
+    assert CustomUser.objects.get(pk=user.pk).following_count == 1
+
+
+@pytest.mark.parametrize('data', ({}, {'ids': []}, {'ids': [0]}))
+def test_batch_rejects_invalid_ids(user_client, data):
+    response = user_client.post('/api/recipes/favorite/', data,
+                                format='json')
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from rest_framework.test import APIClient
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from api.cache import get_cache_version
+from recipes.models import Recipe, Tag
+from recipes.storage import recipe_image_storage
+from recipes.tasks import build_image_variants
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_tag_change_invalidates_after_commit():
+    client = APIClient()
+    assert client.get('/api/tags/').json() == []
+    version = get_cache_version('tags')
+    with transaction.atomic():
+        Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        # Until the commit, readers still see the old rows.
+        assert get_cache_version('tags') == version
+        assert client.get('/api/tags/').json() == []
+    assert get_cache_version('tags') != version
+    assert [tag['slug'] for tag in client.get('/api/tags/').json()] == [
+        'lunch']
+
+
+def test_image_variants_invalidate_the_recipe(settings, tmp_path, author):
+    settings.MEDIA_ROOT = tmp_path
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, 'PNG')
+    image = recipe_image_storage.save('recipes/images/recipe.png',
+                                      ContentFile(buffer.getvalue()))
+    recipe = Recipe.objects.create(
+        author=author, name='Recipe', text='Text', cooking_time=10,
+        image=image,
+    )
+    client = APIClient()
+    url = f'/api/recipes/{recipe.pk}/'
+    assert client.get(url).json()['image_variants'] is None
+    build_image_variants(recipe_id=recipe.pk, name=image)
+    assert client.get(url).json()['image_variants']
@@ -0,0 +1,26 @@
+import pytest
+
+from api.management.commands.explain_queries import SEQUENTIAL_SCANS
+
+
+def scanned(plan):
+    return {
+        table for pattern in SEQUENTIAL_SCANS
+        for table in pattern.findall(plan)
+    }
+
+
+@pytest.mark.parametrize('plan, tables', (
+    ('5 0 0 SCAN recipes_recipe', {'recipes_recipe'}),
+    ('2 0 0 SCAN TABLE recipes_tag', {'recipes_tag'}),
+    ('6 0 0 SCAN recipes_recipe USING INDEX recipe_pub_date_id_idx', set()),
+    ('3 0 0 SCAN recipes_ingredient USING COVERING INDEX name_idx', set()),
+    ('4 0 0 SEARCH recipes_favorite USING INDEX user_idx (user_id=?)',
+     set()),
+    ('Limit  (cost=0.00..1.10 rows=10 width=8)\n'
+     '  ->  Seq Scan on recipes_recipe  (cost=0.00..11.00 rows=100)',
+     {'recipes_recipe'}),
+    ('Index Scan using recipe_pub_date_id_idx on recipes_recipe', set()),
+))
+def test_sequential_scans(plan, tables):
+    assert scanned(plan) == tables
@@ -0,0 +1,59 @@
+import pytest
+
+from recipes.models import FeedItem, Recipe
+from users.models import CustomUser, Follow
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def create_user(name):
+    return CustomUser.objects.create_user(
+        username=name, email=f'{name}@example.com', password='pass')
+
+
+def create_recipes(author, count):
+    for number in range(count):
+        Recipe.objects.create(
+            author=author, name=f'{author.username} {number}', text='Text',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+
+
+def read_feed(client, limit):
+    ids, url = [], f'/api/recipes/feed/?limit={limit}'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = [recipe['id'] for recipe in response.json()['results']]
+        assert len(page) <= limit
+        ids.extend(page)
+        url = response.json()['next']
+    return ids
+
+
+def test_feed_pages_in_order(settings, user, author, user_client):
+    settings.FEED_FANOUT_LIMIT = 1
+    popular, stranger = create_user('popular'), create_user('stranger')
+    Follow.objects.create(follower=stranger, following=popular)
+    for recipe_author, count in ((author, 3), (popular, 3), (stranger, 2)):
+        create_recipes(recipe_author, count)
+    for followed in (author, popular):
+        response = user_client.post(f'/api/users/{followed.pk}/subscribe/')
+        assert response.status_code == 200
+    # Only the author below the fan-out limit is copied into the feed.
+    assert set(FeedItem.objects.values_list('author_id', flat=True)) == {
+        author.pk}
+
+    expected = list(Recipe.objects.filter(
+        author__in=(author, popular)
+    ).order_by('-pub_date', '-id').values_list('pk', flat=True))
+    assert read_feed(user_client, 2) == expected
+
+    user_client.delete(f'/api/users/{author.pk}/subscribe/')
+    assert read_feed(user_client, 2) == list(Recipe.objects.filter(
+        author=popular).order_by('-pub_date', '-id').values_list(
+        'pk', flat=True))
+
+
+def test_feed_requires_authentication(client):
+    assert client.get('/api/recipes/feed/').status_code == 401
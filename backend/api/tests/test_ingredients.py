@@ -0,0 +1,27 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.autocomplete import ingredient_index
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_retrieve_ignores_name_filter():
+    ingredient = Ingredient.objects.create(
+        name='абрикосы', measurement_unit='г')
+    response = APIClient().get(
+        f'/api/ingredients/{ingredient.pk}/', {'name': 'абр'})
+    assert response.status_code == 200
+    assert response.json()['name'] == 'абрикосы'
+
+
+def test_index_picks_up_changes_of_other_processes(monkeypatch):
+    client = APIClient()
+    assert client.get('/api/ingredients/', {'name': 'zzq'}).json() == []
+    # bulk_create sends no signals, like a write in another process.
+    Ingredient.objects.bulk_create(
+        [Ingredient(name='zzqbar', measurement_unit='г')])
+    monkeypatch.setattr(ingredient_index, 'max_age', 0)
+    response = client.get('/api/ingredients/', {'name': 'zzqb'})
+    assert [item['name'] for item in response.json()] == ['zzqbar']
@@ -0,0 +1,57 @@
+import base64
+import json
+
+import pytest
+
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+@pytest.fixture
+def recipes(author):
+    return [
+        Recipe.objects.create(
+            author=author, name=f'Recipe {number}', text='Text',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+        for number in range(5)
+    ]
+
+
+def test_cursor_pages_forward(user_client, recipes):
+    url = '/api/recipes/?cursor=&limit=2'
+    seen = []
+    while url:
+        response = user_client.get(url)
+        assert response.status_code == 200
+        seen.extend(recipe['id'] for recipe in response.json()['results'])
+        url = response.json()['next']
+    expected = Recipe.objects.order_by('-pub_date', '-id')
+    assert seen == [recipe.pk for recipe in expected]
+
+
+@pytest.mark.parametrize('value', (
+    'not base64!',
+    cursor({'pub_date': 1}),
+    cursor([1]),
+    cursor(['x', 'y']),
+    cursor(['2021-01-01T00:00:00+00:00', 'y']),
+    cursor(['2021-01-01T00:00:00+00:00', None]),
+    cursor([[], 1]),
+))
+@pytest.mark.parametrize('url', ('/api/recipes/', '/api/recipes/feed/'))
+def test_malformed_cursor(user_client, recipes, url, value):
+    response = user_client.get(url, {'cursor': value})
+    assert response.status_code == 404
+
+
+def test_cursor_rejects_ordering(user_client, recipes):
+    response = user_client.get('/api/recipes/',
+                               {'cursor': '', 'ordering': 'popular'})
+    assert response.status_code == 400
+    assert 'ordering' in response.json()
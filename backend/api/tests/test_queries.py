@@ -0,0 +1,48 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from users.models import Follow
+
+# Cached responses are invalidated on commit.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def create_recipes(author, user, count):
+    tag = Tag.objects.get_or_create(
+        name='Завтрак', color='#E26C2D', slug='breakfast')[0]
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Recipe {number}', text='Text',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+        recipe.tags.add(tag)
+        Favorite.objects.create(user=user, recipe=recipe)
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/',
+    # Not served from the response cache.
+    '/api/recipes/?is_in_shopping_cart=0',
+))
+def test_recipe_list_queries_do_not_depend_on_page_size(
+        url, user, author, user_client, django_assert_num_queries):
+    Follow.objects.create(follower=author, following=user)
+    create_recipes(author, user, 1)
+    with CaptureQueriesContext(connection) as single:
+        response = user_client.get(url)
+    assert response.status_code == 200
+    assert response.json()['results'][0]['is_favorited'] is True
+
+    create_recipes(author, user, 5)
+    with django_assert_num_queries(len(single.captured_queries)):
+        response = user_client.get(url)
+    results = response.json()['results']
+    assert len(results) == 6
+    assert all(
+        recipe['is_favorited'] and recipe['is_in_shopping_cart']
+        and recipe['author']['is_subscribed'] for recipe in results
+    )
@@ -0,0 +1,62 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Tag
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def image():
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+@pytest.fixture
+def ingredients():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ingredient {number}', measurement_unit='г')
+        for number in range(25)
+    )
+    return list(Ingredient.objects.order_by('pk'))
+
+
+def recipe_data(image, ingredients, tag):
+    return {
+        'name': 'Recipe', 'text': 'Text', 'cooking_time': 10,
+        'image': image, 'tags': [tag.pk],
+        'ingredients': [
+            {'id': ingredient.pk, 'amount': 10} for ingredient in ingredients
+        ],
+    }
+
+
+def test_recipe_write_queries_do_not_depend_on_ingredients(
+        settings, tmp_path, user_client, image, ingredients):
+    settings.MEDIA_ROOT = tmp_path
+    tag = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    counts = []
+    for size in (5, 25):
+        data = recipe_data(image, ingredients[:size], tag)
+        with CaptureQueriesContext(connection) as create:
+            response = user_client.post('/api/recipes/', data,
+                                        format='json')
+        assert response.status_code == 201
+        assert len(response.json()['ingredients']) == size
+        data['ingredients'][0]['amount'] = 20
+        url = f'/api/recipes/{response.json()["id"]}/'
+        with CaptureQueriesContext(connection) as update:
+            response = user_client.patch(url, data, format='json')
+        assert response.status_code == 200
+        assert response.json()['ingredients'][0]['amount'] == 20
+        counts.append(
+            (len(create.captured_queries), len(update.captured_queries)))
+    assert counts[0] == counts[1]
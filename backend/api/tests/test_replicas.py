@@ -0,0 +1,69 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from django.db import connections
+
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica_1']
+)
+
+# Not served from the response cache, which reads from the primary.
+RECIPES_URL = '/api/recipes/?is_favorited=0'
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica_1']
+
+
+def sync_replica():
+    """Copy the primary into the replica, like replication catching up."""
+    for alias in ('default', 'replica_1'):
+        connections[alias].ensure_connection()
+    connections['default'].connection.backup(
+        connections['replica_1'].connection
+    )
+
+
+def create_recipe(author, name):
+    return Recipe.objects.create(
+        author=author, name=name, text='Text', cooking_time=10,
+        image='recipes/images/recipe.png',
+    )
+
+
+def authenticated_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def test_reads_go_to_the_replica(author):
+    create_recipe(author, 'Replicated')
+    sync_replica()
+    create_recipe(author, 'Lagging')
+
+    response = APIClient().get(RECIPES_URL)
+    assert [recipe['name'] for recipe in response.json()['results']] == [
+        'Replicated']
+
+
+def test_writes_pin_the_client_to_the_primary(user, author):
+    create_recipe(author, 'Replicated')
+    sync_replica()
+    recipe = create_recipe(author, 'Lagging')
+    client = authenticated_client(user)
+    assert client.get(RECIPES_URL).json()['count'] == 1
+
+    response = client.post(f'/api/recipes/{recipe.pk}/favorite/')
+    assert response.status_code == 201
+    results = client.get(RECIPES_URL).json()['results']
+    assert [(item['name'], item['is_favorited']) for item in results] == [
+        ('Lagging', True), ('Replicated', False)]
+    # The pin follows the token, not only the cookie.
+    assert authenticated_client(user).get(RECIPES_URL).json()['count'] == 2
+    assert APIClient().get(RECIPES_URL).json()['count'] == 1
@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+from rest_framework.authtoken.models import Token
+
+from foodgram.asgi import application
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def cart(user, author):
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+    milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+    for number, amount in enumerate((5, 10)):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Recipe {number}', text='Text',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=salt, amount=amount)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=milk, amount=100)
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+def asgi_get(path, headers):
+    """Run a GET request through the ASGI application."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path':
+        path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver')] + headers,
+        'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+    }
+    asyncio.run(application(scope, receive, send))
+    start, *body = messages
+    return start['status'], b''.join(part.get('body', b'') for part in body)
+
+
+def test_download_through_asgi(user, cart):
+    token = Token.objects.create(user=user)
+    status, body = asgi_get(
+        '/api/recipes/download_shopping_cart/',
+        [(b'authorization', f'Token {token.key}'.encode())],
+    )
+    assert status == 200
+    assert body.decode() == (
+        'Shopping list\n\n'
+        '1. молоко – 200 мл\n'
+        '2. соль – 15 г\n'
+    )
+
+
+@pytest.mark.parametrize('export_format, content_type, content', (
+    ('txt', 'text/plain',
+     'Shopping list\n\n1. молоко – 200 мл\n2. соль – 15 г\n'),
+    ('csv', 'text/csv',
+     'name,measurement_unit,amount\r\nмолоко,мл,200\r\nсоль,г,15\r\n'),
+))
+def test_text_exports(user_client, cart, export_format, content_type,
+                      content):
+    response = user_client.get('/api/recipes/download_shopping_cart/',
+                               {'format': export_format})
+    assert response.status_code == 200
+    assert response['Content-Type'] == f'{content_type}; charset=utf-8'
+    assert response['Content-Disposition'] == (
+        f'attachment; filename=shopping_cart.{export_format}')
+    assert b''.join(response.streaming_content).decode() == content
+
+
+def test_json_export(user_client, cart):
+    response = user_client.get('/api/recipes/download_shopping_cart/',
+                               HTTP_ACCEPT='application/json')
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == (
+        'attachment; filename=shopping_cart.json')
+    assert json.loads(b''.join(response.streaming_content)) == [
+        {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 200},
+        {'name': 'соль', 'measurement_unit': 'г', 'amount': 15},
+    ]
+
+
+def test_empty_cart_export(user_client):
+    response = user_client.get('/api/recipes/download_shopping_cart/',
+                               {'format': 'json'})
+    assert json.loads(b''.join(response.streaming_content)) == []
@@ -0,0 +1,59 @@
+import pytest
+
+from recipes.models import Recipe
+from users.models import CustomUser, Follow
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_set_password_keeps_counters(user, author, user_client):
+    response = user_client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 200
+
+    response = user_client.post('/api/users/set_password/', {
+        'current_password': 'pass', 'new_password': 'Nw8-secret-pass',
+    })
+    assert response.status_code == 200
+    user = CustomUser.objects.get(pk=user.pk)
+    assert user.following_count == 1
+    assert user.check_password('Nw8-secret-pass')
+
+
+def test_subscribe_counts_recipes_created_outside_the_api(author, user_client):
+    Recipe.objects.create(
+        author=author, name='Recipe', text='Text', cooking_time=10,
+        image='recipes/images/recipe.png',
+    )
+    response = user_client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 200
+    assert len(response.json()['recipes']) == 1
+    assert response.json()['recipes_count'] == 1
+
+
+@pytest.mark.parametrize('recipes_limit', ('abc', '-1', '1.5'))
+def test_invalid_recipes_limit(user, author, user_client, recipes_limit):
+    params = {'recipes_limit': recipes_limit}
+    response = user_client.post(
+        f'/api/users/{author.pk}/subscribe/?recipes_limit={recipes_limit}')
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.json()
+    assert not Follow.objects.exists()
+
+    Follow.objects.create(follower=user, following=author)
+    response = user_client.get('/api/users/subscriptions/', params)
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.json()
+
+
+def test_recipes_limit(user, author, user_client):
+    for number in range(3):
+        Recipe.objects.create(
+            author=author, name=f'Recipe {number}', text='Text',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+    Follow.objects.create(follower=user, following=author)
+    response = user_client.get('/api/users/subscriptions/',
+                               {'recipes_limit': 2})
+    assert response.status_code == 200
+    assert len(response.json()['results'][0]['recipes']) == 2
+    assert response.json()['results'][0]['recipes_count'] == 3
@@ -1,7 +1,9 @@
 from rest_framework.routers import DefaultRouter
 
+from django.conf import settings
 from django.urls import include, path
 
+from .async_views import serve_async
 from .views import (
     CustomUserViewSet, IngredientViewSet, RecipeViewSet, TagViewSet,
 )
@@ -15,8 +17,20 @@ router.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 router.register(r'tags', TagViewSet, basename='tags')
 
+ASYNC_ROUTES = (
+    'recipes-list', 'recipes-detail', 'tags-list', 'tags-detail',
+    'ingredients-list', 'ingredients-detail', 'users-subscriptions',
+)
+
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = [
+        serve_async(url) if url.name in ASYNC_ROUTES else url
+        for url in router_urls
+    ]
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
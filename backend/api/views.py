@@ -1,5 +1,3 @@
-from io import StringIO
-
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
@@ -7,27 +5,45 @@ from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Exists, OuterRef, Prefetch, Subquery, Sum, Value,
+)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
+from recipes.counters import RECIPE_COUNTERS, change_counter
+from recipes.feed import feed_positions, trim
 from recipes.models import (
     Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag,
 )
+from recipes.tasks import backfill_feed, fan_out_recipe
+from taskqueue.queue import defer
 from users.models import CustomUser, Follow
 
+from .cache import CachedResponseMixin, TaggedResponseMixin
 from .filters import IngredientFilter, RecipeFilter
-from .paginations import LimitPagination
+from .paginations import (
+    KeysetPagination, LimitPagination, RecipePagination,
+    SubscriptionPagination,
+)
 from .permissions import IsAuthorOrReadOnly
+from .renderers import (
+    ShoppingCartCSVRenderer, ShoppingCartJSONRenderer,
+    ShoppingCartTextRenderer,
+)
 from .serializers import (
-    ChangePasswordSerializer, CustomUserCreateSerializer, CustomUserSerializer,
-    FollowSerializer, GetRecipeSerializer, IngredientSerializer,
-    RecipeInfoSerializer, RecipeSerializer, TagSerializer,
+    BatchSerializer, ChangePasswordSerializer, CustomUserCreateSerializer,
+    CustomUserSerializer, FollowSerializer, GetRecipeSerializer,
+    IngredientSerializer, RecipeInfoSerializer, RecipeSerializer,
+    TagSerializer, get_recipes_limit,
 )
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """Ingredient view."""
 
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientFilter,)
@@ -36,37 +52,121 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """Tag view."""
 
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TaggedResponseMixin, viewsets.ModelViewSet):
     """Recipe view."""
 
+    cache_namespace = 'recipes'
+    cacheable_params = ('page', 'limit', 'cursor', 'tags', 'author')
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = LimitPagination
+    pagination_class = RecipePagination
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return GetRecipeSerializer
         return RecipeSerializer
 
+    def get_prefetch_lookups(self, action):
+        if action in ('list', 'retrieve', 'feed'):
+            return (
+                'tags',
+                Prefetch(
+                    'recipe_ingredient',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient')
+                ),
+            )
+        if action in ('create', 'update', 'partial_update'):
+            return ('tags',)
+        return ()
+
+    def annotate_user_flags(self, recipes, user):
+        if user.is_anonymous:
+            return recipes.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(
+                    False, output_field=BooleanField()
+                ),
+            )
+        return recipes.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Follow.objects.filter(
+                follower=OuterRef('author'), following=user)),
+        )
+
     def get_queryset(self):
         recipes = Recipe.objects.select_related(
-            'author').prefetch_related('tags', 'ingredients')
-        return recipes
+            'author').prefetch_related(*self.get_prefetch_lookups(self.action))
+        return self.annotate_user_flags(recipes, self.request.user)
+
+    def get_saved_recipe(self, recipe):
+        """Reload a written recipe the way retrieve reads it."""
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            *self.get_prefetch_lookups('retrieve'))
+        return self.annotate_user_flags(
+            recipes, self.request.user).get(pk=recipe.pk)
+
+    def get_cache_tags(self, request, data):
+        recipes = data['results'] if self.action == 'list' else [data]
+        tags = set()
+        for recipe in recipes:
+            tags.add(f'recipe:{recipe["id"]}')
+            tags.add(f'author:{recipe["author"]["id"]}')
+            tags.update(f'tag:{tag["id"]}' for tag in recipe['tags'])
+        if self.action == 'list':
+            # New and deleted recipes change which ones a list holds.
+            authors = request.query_params.getlist('author')
+            if authors:
+                tags.update(f'recipes:author:{author}' for author in authors)
+            else:
+                tags.add('recipes')
+        return tags
+
+    def personalize(self, data, user):
+        recipes = data['results'] if self.action == 'list' else [data]
+        flags = {
+            pk: (is_favorited, is_in_shopping_cart, author_is_subscribed)
+            for pk, is_favorited, is_in_shopping_cart, author_is_subscribed
+            in self.annotate_user_flags(
+                Recipe.objects.filter(pk__in=[
+                    recipe['id'] for recipe in recipes
+                ]),
+                user
+            ).values_list('pk', 'is_favorited', 'is_in_shopping_cart',
+                          'author_is_subscribed')
+        }
+        for recipe in recipes:
+            (recipe['is_favorited'], recipe['is_in_shopping_cart'],
+             recipe['author']['is_subscribed']) = flags.get(
+                recipe['id'], (False, False, False)
+            )
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        recipe = serializer.save(author=self.request.user)
+        defer(fan_out_recipe, key=f'fan-out:{recipe.pk}', recipe_id=recipe.pk)
+        serializer.instance = self.get_saved_recipe(recipe)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        serializer.instance = self.get_saved_recipe(serializer.instance)
 
     def get_obj(self, model, user, pk):
         if model.objects.filter(user=user, recipe__id=pk).exists():
@@ -74,7 +174,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 'errors': 'You have already add this recipe!'
             }, status=status.HTTP_400_BAD_REQUEST)
         recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
+        # The counter receivers run in the same transaction.
+        with transaction.atomic():
+            model.objects.create(user=user, recipe=recipe)
         serializer = RecipeInfoSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -88,6 +190,76 @@ class RecipeViewSet(viewsets.ModelViewSet):
                          },
                         status=status.HTTP_400_BAD_REQUEST)
 
+    def add_batch(self, model, user, ids):
+        recipes = Recipe.objects.filter(pk__in=ids).annotate(
+            added=Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        ).only('name', 'image', 'image_variants', 'cooking_time').in_bulk()
+        new = [pk for pk in ids if pk in recipes and not recipes[pk].added]
+        if new:
+            with transaction.atomic():
+                # bulk_create skips the signals that maintain the counter.
+                model.objects.bulk_create(
+                    [model(user=user, recipe_id=pk) for pk in new],
+                    ignore_conflicts=True
+                )
+                change_counter(Recipe.objects.filter(pk__in=new),
+                               RECIPE_COUNTERS[model], 1)
+        results = []
+        for pk in ids:
+            if pk not in recipes:
+                results.append({'id': pk, 'status': 404,
+                                'errors': 'Not found.'})
+            elif recipes[pk].added:
+                results.append({'id': pk, 'status': 400,
+                                'errors': 'You have already add this recipe!'})
+            else:
+                results.append({'id': pk, 'status': 201,
+                                'recipe': RecipeInfoSerializer(
+                                    recipes[pk]).data})
+        return Response({'results': results})
+
+    def delete_batch(self, model, user, ids):
+        with transaction.atomic():
+            entries = model.objects.filter(user=user, recipe__in=ids)
+            removed = set(entries.select_for_update().values_list(
+                'recipe_id', flat=True))
+            if removed:
+                entries.filter(recipe__in=removed).delete()
+        return Response({'results': [
+            {'id': pk, 'status': 204} if pk in removed else
+            {'id': pk, 'status': 400,
+             'errors': 'You have already delete this recipe!'}
+            for pk in ids
+        ]})
+
+    def batch(self, model, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        if request.method != 'POST':
+            return self.delete_batch(model, request.user, ids)
+        return self.add_batch(model, request.user, ids)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = KeysetPagination(RecipePagination.keyset_ordering,
+                                     Recipe)
+        paginator.request = request
+        page_size = paginator.get_page_size(request)
+        positions = feed_positions(
+            request.user, page_size + 1, paginator.decode_cursor(request)
+        )
+        paginator.next_position = (
+            positions[page_size - 1] if len(positions) > page_size else None
+        )
+        positions = positions[:page_size]
+        recipes = self.get_queryset().in_bulk([pk for _, pk in positions])
+        serializer = self.get_serializer(
+            [recipes[pk] for _, pk in positions if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
@@ -102,34 +274,45 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.delete_obj(ShoppingCart, request.user, pk)
         return self.get_obj(ShoppingCart, request.user, pk)
 
-    @action(detail=False)
+    @action(detail=False, methods=['post', 'delete'], url_path='favorite',
+            url_name='favorite-batch', permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return self.batch(Favorite, request)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart', url_name='shopping-cart-batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return self.batch(ShoppingCart, request)
+
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            renderer_classes=(ShoppingCartTextRenderer,
+                              ShoppingCartCSVRenderer,
+                              ShoppingCartJSONRenderer))
     def download_shopping_cart(self, request):
-        response = HttpResponse(content_type='text/plain')
+        renderer = request.accepted_renderer
+        # The rows are fetched here: under ASGI the streamed content is
+        # iterated on the event loop, where queries are not allowed.
+        ingredients = list(self.get_shopping_cart_ingredients(request.user))
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
         response['Content-Disposition'] = (
-            'attachment; filename=shopping_cart.txt'
+            f'attachment; filename=shopping_cart.{renderer.format}'
         )
-
-        response.write(self.generate_text_file(request.user))
-
         return response
 
-    def generate_text_file(self, request_user):
-        file = StringIO()
-        file.write('Shopping list\n\n')
-
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request_user).values_list(
-            'ingredient__name', 'amount', 'ingredient__measurement_unit')
-
-        ingredient_list = {}
-        for name, amount, unit in ingredients:
-            if name not in ingredient_list:
-                ingredient_list[name] = {'amount': amount, 'unit': unit}
-            else:
-                ingredient_list[name]['amount'] += amount
-        for i, (name, data) in enumerate(ingredient_list.items(), start=1):
-            file.write(f"{i}. {name} – {data['amount']} {data['unit']}\n")
-        return file.getvalue()
+    def get_shopping_cart_ingredients(self, request_user):
+        return RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user=request_user
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit'
+        ).annotate(
+            total_amount=Sum('amount')
+        ).order_by(
+            'ingredient__name', 'ingredient__measurement_unit'
+        )
 
 
 class CustomUserViewSet(UserViewSet):
@@ -152,7 +335,9 @@ class CustomUserViewSet(UserViewSet):
         serializer = ChangePasswordSerializer(data=request.data)
         if serializer.is_valid():
             user.set_password(serializer.validated_data['new_password'])
-            user.save()
+            # The authenticated user may come from the token cache, so
+            # saving every field would write back stale counters.
+            user.save(update_fields=['password'])
             return Response({'status': 'password set'})
         else:
             return Response(serializer.errors,
@@ -164,10 +349,7 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request, id=None):
-        serializer = CustomUserSerializer(
-            CustomUser.objects.filter(username=self.request.user),
-            many=True
-        )
+        serializer = CustomUserSerializer([request.user], many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
@@ -179,6 +361,8 @@ class CustomUserViewSet(UserViewSet):
         following = get_object_or_404(CustomUser, id=id)
         follower = self.request.user
         if request.method == 'POST':
+            # Reject a bad limit before the subscription is created.
+            get_recipes_limit(request)
             if request.user == following:
                 return Response({
                     'errors': 'Can not subscribe yourself!'
@@ -190,19 +374,25 @@ class CustomUserViewSet(UserViewSet):
                     'errors': f'You have already subscribed {following}!'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            new_follow = Follow.objects.create(
-                following=following,
-                follower=follower
-            )
+            with transaction.atomic():
+                new_follow = Follow.objects.create(
+                    following=following,
+                    follower=follower
+                )
+                defer(backfill_feed, user_id=follower.pk,
+                      author_id=following.pk)
             serializer = FollowSerializer(
                 new_follow,
                 context={'request': request}
             )
             return Response(serializer.data)
         if request.method == 'DELETE':
-            entries = Follow.objects.filter(
-                following=following,
-                follower=follower).delete()
+            with transaction.atomic():
+                entries = Follow.objects.filter(
+                    following=following,
+                    follower=follower).delete()
+                if entries[0] == 1:
+                    trim(follower, following)
             if entries[0] == 1:
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response({'errors': 'You '
@@ -213,10 +403,95 @@ class CustomUserViewSet(UserViewSet):
                              },
                             status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['get'])
-    def subscriptions(self, request):
+    @action(detail=False, methods=['post', 'delete'], url_path='subscribe',
+            url_name='subscribe-batch', permission_classes=[IsAuthenticated])
+    def subscribe_batch(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        if request.method != 'POST':
+            return self.unsubscribe_batch(request.user, ids)
         follower = request.user
-        queryset = Follow.objects.filter(follower=follower)
+        authors = CustomUser.objects.filter(pk__in=ids).annotate(
+            followed=Exists(Follow.objects.filter(
+                follower=follower, following=OuterRef('pk')))
+        ).only('username').in_bulk()
+        new = [
+            pk for pk in ids
+            if pk in authors and pk != follower.pk and not authors[pk].followed
+        ]
+        if new:
+            with transaction.atomic():
+                # bulk_create skips the signals that maintain the counters.
+                Follow.objects.bulk_create(
+                    [Follow(follower=follower, following_id=pk)
+                     for pk in new],
+                    ignore_conflicts=True
+                )
+                change_counter(CustomUser.objects.filter(pk__in=new),
+                               'followers_count', 1)
+                change_counter(CustomUser.objects.filter(pk=follower.pk),
+                               'following_count', len(new))
+                for pk in new:
+                    defer(backfill_feed, user_id=follower.pk, author_id=pk)
+        results = []
+        for pk in ids:
+            if pk not in authors:
+                results.append({'id': pk, 'status': 404,
+                                'errors': 'Not found.'})
+            elif pk == follower.pk:
+                results.append({'id': pk, 'status': 400,
+                                'errors': 'Can not subscribe yourself!'})
+            elif authors[pk].followed:
+                results.append({
+                    'id': pk, 'status': 400,
+                    'errors': f'You have already subscribed {authors[pk]}!'
+                })
+            else:
+                results.append({'id': pk, 'status': 201})
+        return Response({'results': results})
+
+    def unsubscribe_batch(self, follower, ids):
+        with transaction.atomic():
+            follows = Follow.objects.filter(follower=follower,
+                                            following__in=ids)
+            removed = set(follows.select_for_update().values_list(
+                'following_id', flat=True))
+            if removed:
+                follows.filter(following__in=removed).delete()
+                trim(follower, *removed)
+        return Response({'results': [
+            {'id': pk, 'status': 204} if pk in removed else
+            {'id': pk, 'status': 400,
+             'errors': 'You are not subscribed on this author!'}
+            for pk in ids
+        ]})
+
+    def get_subscriptions_queryset(self, request):
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:recipes_limit]
+            ))
+        return Follow.objects.filter(
+            follower=request.user
+        ).select_related('following').annotate(
+            is_subscribed=Exists(Follow.objects.filter(
+                following=OuterRef('follower'),
+                follower=OuterRef('following'))),
+        ).prefetch_related(Prefetch(
+            'following__recipe_set',
+            queryset=recipes,
+            to_attr='recipes_preview'
+        )).order_by('id')
+
+    @action(detail=False, methods=['get'],
+            pagination_class=SubscriptionPagination)
+    def subscriptions(self, request):
+        queryset = self.get_subscriptions_queryset(request)
         pages = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
             pages,
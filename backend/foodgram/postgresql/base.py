@@ -0,0 +1,124 @@
+import os
+import threading
+
+from psycopg2 import Error
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from django.db.backends.postgresql import base
+
+
+class ConnectionPool:
+    """Idle connections of one database, shared by the threads of a process.
+
+    Holds at most ``size`` idle connections; a connection returned to a
+    full pool is closed.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def get(self):
+        with self.lock:
+            return self.idle.pop() if self.idle else None
+
+    def put(self, entry):
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append(entry)
+                return True
+        return False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with connection health checks and pooling.
+
+    ``CONN_HEALTH_CHECKS`` pings a persistent connection before its first
+    query in a request and reconnects if the ping fails, instead of
+    failing the request. ``POOL_SIZE`` keeps up to that many idle
+    connections per process: closing a connection at the end of a
+    request hands it back to the pool, and the next connect takes it
+    from there without a new PostgreSQL backend being started.
+    """
+
+    pools = {}
+    pools_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def pool(self):
+        size = self.settings_dict.get('POOL_SIZE') or 0
+        if size <= 0:
+            return None
+        key = (os.getpid(), self.alias, self.settings_dict['NAME'])
+        with self.pools_lock:
+            if key not in self.pools:
+                self.pools[key] = ConnectionPool(size)
+            return self.pools[key]
+
+    def is_healthy(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        while pool is not None:
+            entry = pool.get()
+            if entry is None:
+                break
+            connection, self.isolation_level = entry
+            if not self.settings_dict.get('CONN_HEALTH_CHECKS') or (
+                self.is_healthy(connection)
+            ):
+                return connection
+            connection.close()
+        return super().get_new_connection(conn_params)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def release(self, connection):
+        """Reset a connection and put it back into the pool."""
+        try:
+            if connection.closed:
+                return False
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            connection.autocommit = True
+        except Error:
+            return False
+        return self.pool.put((connection, self.isolation_level))
+
+    def _close(self):
+        # A connection that raised errors or is still referenced by an
+        # atomic block is really closed.
+        if (self.connection is not None and self.pool is not None
+                and not self.errors_occurred and not self.in_atomic_block
+                and self.release(self.connection)):
+            return
+        return super()._close()
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or self.health_check_done
+                or not self.settings_dict.get('CONN_HEALTH_CHECKS')):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
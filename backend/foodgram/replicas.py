@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Read from the primary even in safe requests: a token must work
+# right after login.
+PRIMARY_MODELS = ('authtoken.token',)
+
+read_database = ContextVar('read_database', default=None)
+
+
+class ReplicaRouter:
+    """Send reads of safe requests to a replica and the rest to default.
+
+    Reads outside a request, such as in commands and the task worker,
+    always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return 'default'
+        return read_database.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+    """Pick the replica a request reads from.
+
+    Unsafe requests read from the primary and pin their client to it for
+    ``REPLICA_PIN_SECONDS``, through a cookie and a cache entry keyed by
+    the ``Authorization`` header, so the client reads its own writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def get_pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return f'db:pin:{digest}'
+
+    def is_pinned(self, request, pin_key):
+        if request.method not in SAFE_METHODS:
+            return True
+        if PIN_COOKIE in request.COOKIES:
+            return True
+        return pin_key is not None and cache.get(pin_key) is not None
+
+    def choose_replica(self, request, pin_key):
+        if self.is_pinned(request, pin_key):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        pin_key = self.get_pin_key(request)
+        token = read_database.set(self.choose_replica(request, pin_key))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response, pin_key)
+
+    async def __acall__(self, request):
+        pin_key = self.get_pin_key(request)
+        token = read_database.set(self.choose_replica(request, pin_key))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response, pin_key)
+
+    def pin(self, request, response, pin_key):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+            if pin_key is not None:
+                cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary within the block."""
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
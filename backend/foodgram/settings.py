@@ -20,15 +20,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework.authtoken',
     'rest_framework',
     'django_filters',
     'djoser',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'taskqueue.apps.TaskQueueConfig',
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.InstrumentationMiddleware',
+    'foodgram.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,17 +64,109 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Seconds to keep a connection between requests; with a pool
+        # (DB_POOL_SIZE > 0) use 0 so it goes back to the pool instead.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+        ),
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 0)),
+        # Required behind pgbouncer in transaction pooling mode.
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', '') == 'True'
+        ),
     }
+}
+
+# Comma-separated host[:port] list of read replicas of the default database.
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
 
+DATABASE_ROUTERS = ['foodgram.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
 
+# Serve the read endpoints as async views when run under ASGI (uvicorn);
+# their queries run on a pool of ASYNC_DB_THREADS threads per process.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '') == 'True'
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 60 * 60))
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+
+INGREDIENT_INDEX_MAX_SIZE = int(
+    os.getenv('INGREDIENT_INDEX_MAX_SIZE', 100_000)
+)
+# Seconds after which the index is rebuilt to pick up changes made by
+# other processes.
+INGREDIENT_INDEX_MAX_AGE = int(os.getenv('INGREDIENT_INDEX_MAX_AGE', 60))
+
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', '') == 'True'
+INSTRUMENTATION_METRICS = os.getenv('INSTRUMENTATION_METRICS', '') == 'True'
+INSTRUMENTATION_DUPLICATE_THRESHOLD = int(
+    os.getenv('INSTRUMENTATION_DUPLICATE_THRESHOLD', 3)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 10_000))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+FEED_BATCH_SIZE = 1000
+
+TASKS_SYNC = os.getenv('TASKS_SYNC', '') == 'True'
+TASKS_RETRY_DELAY = 10
+TASKS_RETRY_MAX_DELAY = 60 * 60
+
+BATCH_MAX_SIZE = 100
+
+AUTH_TOKEN_CACHE_SIZE = 10_000
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 5 * 60))
+AUTH_TOKEN_LOCAL_TIMEOUT = int(os.getenv('AUTH_TOKEN_LOCAL_TIMEOUT', 10))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -91,7 +187,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -130,3 +226,12 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 IMAGE_UPLOAD_PATH = 'recipes/images/'
+IMAGE_VARIANTS_PATH = 'recipes/variants/'
+IMAGE_VARIANTS = {
+    'thumbnail': 320,
+    'medium': 960,
+}
+IMAGE_MAX_UPLOAD_SIZE = int(
+    os.getenv('IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
@@ -0,0 +1,27 @@
+import os
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ.setdefault('ALLOWED_HOSTS', '*')
+
+from .settings import *  # noqa: E402,F401,F403
+
+# Keep the database files of management commands run with these settings
+# out of the source tree.
+DATABASE_DIR = Path(tempfile.gettempdir())
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATABASE_DIR / 'foodgram_test.sqlite3',
+    },
+    # A stand-in read replica. Tests enable routing to it by setting
+    # DATABASE_REPLICAS = ['replica_1'].
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATABASE_DIR / 'foodgram_test_replica.sqlite3',
+    },
+}
+
+TASKS_SYNC = True
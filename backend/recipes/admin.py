@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from .search import update_search_vector
 
 
 @admin.register(Ingredient)
@@ -22,7 +23,7 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorites_number')
+    list_display = ('name', 'author', 'favorites_number', 'in_carts_count')
     search_fields = ['name', 'author__username']
     list_filter = ['tags', 'author']
     inlines = (RecipeIngredientInline, )
@@ -33,12 +34,16 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='В избранном')
     def favorites_number(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     def get_queryset(self, request):
         return super(RecipeAdmin, self).get_queryset(request).select_related(
             'author').prefetch_related('tags', 'ingredients')
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_vector(Recipe.objects.filter(pk=form.instance.pk))
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -1,3 +1,8 @@
 NAME_MAX_LENGTH = 200
 EMAIL_MAX_LENGTH = 254
 COLOR_MAX_LENGTH = 7
+TRENDING_WEIGHTS = {
+    'favorite': 1.0,
+    'shopping_cart': 0.5,
+}
+TRENDING_MIN_SCORE = 0.01
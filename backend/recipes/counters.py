@@ -0,0 +1,15 @@
+from django.db.models import F
+
+from .models import Favorite, ShoppingCart
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def change_counter(queryset, counter, delta):
+    """Add ``delta`` to ``counter`` of every row without going below 0."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{counter}__gte': -delta})
+    queryset.update(**{counter: F(counter) + delta})
@@ -0,0 +1,81 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from users.models import Follow
+
+from .models import FeedItem, Recipe
+
+
+def is_popular(author):
+    """Recipes of popular authors are merged into feeds on read."""
+    return author.followers_count > settings.FEED_FANOUT_LIMIT
+
+
+def fan_out(recipe):
+    """Copy a new recipe into the feeds of the author's followers."""
+    if is_popular(recipe.author):
+        return
+    followers = Follow.objects.filter(
+        following_id=recipe.author_id
+    ).values_list('follower_id', flat=True).iterator()
+    while True:
+        batch = list(islice(followers, settings.FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedItem.objects.bulk_create(
+            (FeedItem(user_id=user, recipe_id=recipe.pk,
+                      author_id=recipe.author_id, pub_date=recipe.pub_date)
+             for user in batch),
+            ignore_conflicts=True
+        )
+
+
+def backfill(user, author):
+    """Add the latest recipes of a newly followed author to the feed."""
+    if is_popular(author):
+        return
+    recipes = Recipe.objects.filter(author=author).order_by(
+        '-pub_date', '-id'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE]
+    FeedItem.objects.bulk_create(
+        (FeedItem(user=user, recipe_id=pk, author=author, pub_date=pub_date)
+         for pk, pub_date in recipes),
+        ignore_conflicts=True
+    )
+
+
+def trim(user, *authors):
+    """Drop the recipes of unfollowed authors from the feed."""
+    FeedItem.objects.filter(user=user, author__in=authors).delete()
+
+
+def before(position, date_field, id_field):
+    if position is None:
+        return Q()
+    date, pk = position
+    return (Q(**{f'{date_field}__lt': date})
+            | Q(**{date_field: date, f'{id_field}__lt': pk}))
+
+
+def feed_positions(user, limit, position=None):
+    """``(pub_date, recipe id)`` of the next ``limit`` feed recipes.
+
+    The stored feed is one range scan over ``feed_user_pub_date_idx``;
+    recipes of followed popular authors are read from the recipe table
+    and merged in.
+    """
+    positions = set(FeedItem.objects.filter(
+        before(position, 'pub_date', 'recipe_id'), user=user
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit])
+    popular = Follow.objects.filter(
+        follower=user,
+        following__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values('following')
+    positions.update(Recipe.objects.filter(
+        before(position, 'pub_date', 'id'), author__in=popular
+    ).order_by('-pub_date', '-id').values_list('pub_date', 'id')[:limit])
+    return sorted(positions, reverse=True)[:limit]
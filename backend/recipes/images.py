@@ -0,0 +1,88 @@
+import logging
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .models import Recipe
+from .signals import image_variants_built
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(name, variant, extension):
+    """Storage name of a resized copy of the image."""
+    root, _ = os.path.splitext(os.path.basename(name))
+    return os.path.join(
+        settings.IMAGE_VARIANTS_PATH, root[:2], f'{root}_{variant}.{extension}'
+    )
+
+
+def open_image(file):
+    image = Image.open(file)
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise ValueError('Image is too large')
+    return image
+
+
+def build_variants(name):
+    """Resize the stored image into every variant and format.
+
+    Returns ``{variant: {extension: storage name}}``. Copies named after
+    a content-addressed image are reused when they already exist.
+    """
+    variants = {
+        variant: {
+            extension: variant_name(name, variant, extension)
+            for extension in FORMATS
+        }
+        for variant in settings.IMAGE_VARIANTS
+    }
+    if all(
+        default_storage.exists(path)
+        for paths in variants.values() for path in paths.values()
+    ):
+        return variants
+    with default_storage.open(name) as file:
+        image = open_image(file)
+        largest = max(settings.IMAGE_VARIANTS.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    for variant, size in sorted(
+        settings.IMAGE_VARIANTS.items(), key=lambda item: -item[1]
+    ):
+        image.thumbnail((size, size))
+        for extension, (format, options) in FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, format, **options)
+            path = variants[variant][extension]
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            variants[variant][extension] = default_storage.save(
+                path, ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def process_recipe_image(recipe_id, name):
+    """Build the variants and store them if the image is still current."""
+    try:
+        variants = build_variants(name)
+    except (OSError, ValueError):
+        logger.exception('Cannot build variants of %s', name)
+        return False
+    if not Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=variants
+    ):
+        return False
+    image_variants_built.send(sender=Recipe, recipe_id=recipe_id)
+    return True
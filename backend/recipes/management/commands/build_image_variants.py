@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build resized copies of recipe images that do not have them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild the copies of every recipe.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        built = failed = 0
+        for recipe_id, name in recipes.values_list('id', 'image').iterator():
+            if process_recipe_image(recipe_id, name):
+                built += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{built} images processed, {failed} failed'
+        ))
@@ -0,0 +1,111 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Delete recipe images and resized copies that no recipe '
+            'refers to.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Keep files younger than this many hours, so images of '
+                 'recipes that are being saved right now survive.'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def referenced_names(self, recipes=None):
+        names = set()
+        if recipes is None:
+            recipes = Recipe.objects.all()
+        recipes = recipes.values_list('image', 'image_variants')
+        for image, variants in recipes.iterator():
+            names.add(image)
+            for paths in variants.values():
+                names.update(paths.values())
+        return names
+
+    def referenced_now(self, names):
+        """Return which of ``names`` recipes refer to at this moment.
+
+        A recipe saved during the walk can refer to an old file again,
+        since identical uploads reuse it, so each batch is re-checked
+        against the recipes whose images share its hash prefixes.
+        """
+        shards = Q()
+        for prefix in {os.path.basename(name)[:2] for name in names}:
+            shards |= Q(image__startswith=os.path.join(
+                settings.IMAGE_UPLOAD_PATH, prefix, ''
+            ))
+        recipes = Recipe.objects.filter(shards)
+        return set(names) & self.referenced_names(recipes)
+
+    def walk(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for name in directories:
+            yield from self.walk(storage, os.path.join(directory, name))
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        referenced = self.referenced_names()
+        self.threshold = timezone.now() - timedelta(
+            hours=options['min_age'])
+        locations = (
+            (storage, settings.IMAGE_UPLOAD_PATH),
+            (default_storage, settings.IMAGE_VARIANTS_PATH),
+        )
+        deleted = kept = 0
+        for location_storage, directory in locations:
+            batch = []
+            for name in self.walk(location_storage, directory):
+                if (
+                    name in referenced
+                    or location_storage.get_modified_time(name)
+                    > self.threshold
+                ):
+                    kept += 1
+                    continue
+                batch.append(name)
+                if len(batch) >= options['batch_size']:
+                    count = self.delete(location_storage, batch, options)
+                    deleted += count
+                    kept += len(batch) - count
+                    batch = []
+            count = self.delete(location_storage, batch, options)
+            deleted += count
+            kept += len(batch) - count
+        action = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} files {action}, {kept} kept'
+        ))
+
+    def delete(self, storage, names, options):
+        if not names:
+            return 0
+        referenced = self.referenced_now(names)
+        # Identical re-uploads touch the file they reuse, so check the
+        # age again as well.
+        names = [
+            name for name in names
+            if name not in referenced
+            and storage.get_modified_time(name) <= self.threshold
+        ]
+        if not options['dry_run']:
+            for name in names:
+                storage.delete(name)
+        if names and options['verbosity'] > 1:
+            self.stdout.write('\n'.join(names))
+        return len(names)
@@ -0,0 +1,199 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from PIL import Image
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db.models import Max
+from django.utils import timezone
+
+from api.cache import invalidate_cache
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag,
+)
+from recipes.search import update_search_vector
+from users.models import CustomUser, Follow
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'омлет', 'рагу', 'запеканка', 'паста',
+    'плов', 'борщ', 'блины', 'котлеты', 'соус', 'десерт', 'смузи', 'хлеб',
+)
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic users, recipes, favorites, '
+            'carts and follows for load testing.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--zipf', type=float, default=1.2,
+            help='Exponent of the power law that spreads recipes over '
+                 'authors and favorites over recipes.'
+        )
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread publication dates over this period.')
+        parser.add_argument('--password', default='benchmark-password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def power_law(self, population):
+        """Shuffled population with cumulative Zipf weights."""
+        population = list(population)
+        self.random.shuffle(population)
+        weights = accumulate(
+            1 / rank ** self.zipf for rank in range(1, len(population) + 1)
+        )
+        return population, list(weights)
+
+    def sample(self, distribution, count):
+        """Up to ``count`` distinct items drawn from a power law."""
+        population, weights = distribution
+        return set(self.random.choices(
+            population, cum_weights=weights, k=min(count, len(population))
+        ))
+
+    def insert(self, model, objects, **kwargs):
+        """Bulk insert without building the whole list in memory."""
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return
+            model.objects.bulk_create(batch, **kwargs)
+
+    def create(self, model, objects):
+        last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        self.insert(model, objects)
+        return list(model.objects.filter(
+            pk__gt=last_pk
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_users(self, count, password):
+        start = (CustomUser.objects.aggregate(last=Max('pk'))['last'] or 0)
+        password = make_password(password)
+        return self.create(CustomUser, (
+            CustomUser(
+                email=f'bench{start + number}@example.com',
+                username=f'bench{start + number}',
+                first_name='Bench',
+                last_name=f'User {start + number}',
+                password=password,
+            ) for number in range(1, count + 1)
+        ))
+
+    def create_image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), (214, 137, 16)).save(buffer, 'JPEG')
+        field = Recipe._meta.get_field('image')
+        return field.storage.save(
+            field.generate_filename(None, 'generated.jpeg'),
+            ContentFile(buffer.getvalue())
+        )
+
+    def create_recipes(self, users, count, days):
+        image = self.create_image()
+        population, weights = self.power_law(users)
+        authors = self.random.choices(population, cum_weights=weights, k=count)
+        recipes = self.create(Recipe, (
+            Recipe(
+                author_id=author,
+                name=f'{self.random.choice(WORDS).capitalize()} '
+                     f'{self.random.choice(WORDS)} #{number}',
+                text=' '.join(self.random.choices(WORDS, k=30)),
+                cooking_time=self.random.randint(5, 180),
+                image=image,
+            ) for number, author in enumerate(authors)
+        ))
+        now = timezone.now()
+        dates = sorted(
+            now - timedelta(seconds=self.random.randint(0, days * 86400))
+            for _ in recipes
+        )
+        Recipe.objects.bulk_update(
+            [Recipe(pk=pk, pub_date=date)
+             for pk, date in zip(recipes, dates)],
+            ('pub_date',), batch_size=self.batch_size
+        )
+        return recipes
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.zipf = options['zipf']
+        self.batch_size = options['batch_size']
+        if not Ingredient.objects.exists():
+            call_command('load_data', stdout=self.stdout)
+        ingredients = list(Ingredient.objects.values_list('pk', flat=True))
+        tags = list(Tag.objects.values_list('pk', flat=True))
+        if not ingredients:
+            raise CommandError('No ingredients to build recipes from')
+
+        users = self.create_users(options['users'], options['password'])
+        self.stdout.write(f'{len(users)} users')
+        recipes = self.create_recipes(
+            users, options['recipes'], options['days']
+        )
+        self.stdout.write(f'{len(recipes)} recipes')
+
+        per_recipe = options['ingredients_per_recipe']
+        amounts = (
+            RecipeIngredient(recipe_id=recipe, ingredient_id=ingredient,
+                             amount=self.random.randint(1, 500))
+            for recipe in recipes
+            for ingredient in self.random.sample(
+                ingredients,
+                min(self.random.randint(max(per_recipe // 2, 1),
+                                        per_recipe * 3 // 2),
+                    len(ingredients))
+            )
+        )
+        self.insert(RecipeIngredient, amounts)
+        self.insert(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.random.sample(
+                tags, self.random.randint(min(1, len(tags)), len(tags))
+            )
+        ))
+
+        popular_recipes = self.power_law(recipes)
+        for model, option in ((Favorite, 'favorites_per_user'),
+                              (ShoppingCart, 'cart_per_user')):
+            self.insert(model, (
+                model(user_id=user, recipe_id=recipe)
+                for user in users
+                for recipe in self.sample(
+                    popular_recipes,
+                    self.random.randint(0, options[option] * 2)
+                )
+            ), ignore_conflicts=True)
+            self.stdout.write(f'{model.objects.count()} {model.__name__}')
+
+        popular_authors = self.power_law(users)
+        self.insert(Follow, (
+            Follow(follower_id=user, following_id=author)
+            for user in users
+            for author in self.sample(
+                popular_authors,
+                self.random.randint(0, options['follows_per_user'] * 2)
+            ) if author != user
+        ), ignore_conflicts=True)
+        self.stdout.write(f'{Follow.objects.count()} Follow')
+
+        update_search_vector(Recipe.objects.filter(pk__gte=recipes[0]))
+        call_command('recount', stdout=self.stdout)
+        call_command('update_trending', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        invalidate_cache('recipes')
+        self.stdout.write(self.style.SUCCESS(
+            f'Users log in as bench<N>@example.com / {options["password"]}'
+        ))
@@ -1,26 +1,305 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
 
-from recipes.models import Ingredient, Tag
+from api.cache import invalidate_cache
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.search import update_search_vector
+from users.models import CustomUser, Follow
 
-MODELS_FILES = {
-    Ingredient: 'ingredients.csv',
-    Tag: 'tags.csv',
+SOURCES = {
+    'ingredients': Ingredient,
+    'tags': Tag,
+    'users': CustomUser,
+    'recipes': Recipe,
+    'follows': Follow,
 }
+DEFAULT_SOURCES = ('ingredients', 'tags')
+CSV_FIELDS = {
+    'ingredients': ('name', 'measurement_unit'),
+    'tags': ('name', 'color', 'slug'),
+    'users': ('email', 'username', 'first_name', 'last_name', 'password'),
+    'follows': ('follower', 'following'),
+}
+CACHE_NAMESPACES = {
+    'ingredients': 'ingredients',
+    'recipes': 'recipes',
+    'tags': 'tags',
+}
+
+
+def read_csv(path, fields):
+    """Yield rows as dicts, skipping the header if the file has one."""
+    with open(path, 'r', encoding='utf-8', newline='') as table:
+        for number, row in enumerate(csv.reader(table)):
+            if not row or number == 0 and tuple(row) == fields:
+                continue
+            yield dict(zip(fields, row))
+
+
+def read_json(path, chunk_size=64 * 1024):
+    """Yield the objects of a JSON array or JSON Lines file one by one."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    with open(path, 'r', encoding='utf-8') as file:
+        while True:
+            buffer = buffer.lstrip('[, \t\r\n')
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    if buffer.strip():
+                        raise CommandError(f'{path}: invalid JSON')
+                    return
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
+    help = ('Load ingredients and tags, and optionally users, recipes and '
+            'follows, from CSV or JSON files. Rows that already exist are '
+            'skipped, so the command can be run repeatedly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources', nargs='*',
+            help=f'What to load: {", ".join(SOURCES)}. Defaults to '
+                 f'ingredients and tags.'
+        )
+        parser.add_argument(
+            '--data-dir',
+            help='Directory with <source>.csv, <source>.json or '
+                 '<source>.jsonl files.'
+        )
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='Only read files of this format.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--hashed-passwords', action='store_true',
+            help='User passwords are Django password hashes, not plain '
+                 'text.'
+        )
+
+    def get_data_dir(self, data_dir):
+        if data_dir:
+            return Path(data_dir)
+        for path in (settings.BASE_DIR / 'data',
+                     settings.BASE_DIR.parent / 'data'):
+            if path.is_dir():
+                return path
+        raise CommandError('Data directory not found, pass --data-dir')
+
+    def read(self, data_dir, source, format):
+        extensions = {'csv': ('csv',), 'json': ('json', 'jsonl')}
+        if source not in CSV_FIELDS:
+            extensions['csv'] = ()
+        for kind in (format,) if format else ('csv', 'json'):
+            for extension in extensions[kind]:
+                path = data_dir / f'{source}.{extension}'
+                if not path.is_file():
+                    continue
+                if kind == 'csv':
+                    return path, read_csv(path, CSV_FIELDS[source])
+                return path, read_json(path)
+        raise CommandError(f'No data file for {source} in {data_dir}')
+
     def handle(self, *args, **options):
-        for model, file in MODELS_FILES.items():
-            with open(
-                    f'{settings.BASE_DIR}/data/{file}',
-                    'r', encoding='utf-8',
-            ) as table:
-                reader = csv.DictReader(table)
-                model.objects.bulk_create(model(**data) for data in reader)
-
-        self.stdout.write(self.style.SUCCESS(
-            'OK')
+        requested = set(options['sources'] or DEFAULT_SOURCES)
+        unknown = requested - set(SOURCES)
+        if unknown:
+            raise CommandError(f'Unknown sources: {", ".join(unknown)}')
+        data_dir = self.get_data_dir(options['data_dir'])
+        self.password_hashes = {}
+        self.hashed_passwords = options['hashed_passwords']
+        sources = [name for name in SOURCES if name in requested]
+        for source in sources:
+            path, rows = self.read(data_dir, source, options['format'])
+            model = SOURCES[source]
+            load = getattr(self, f'load_{source}')
+            before = model.objects.count()
+            started = time.monotonic()
+            read = 0
+            for batch in batches(rows, options['batch_size']):
+                with transaction.atomic():
+                    load(batch)
+                read += len(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(self.progress(source, read, started))
+            created = model.objects.count() - before
+            self.stdout.write(self.style.SUCCESS(
+                f'{path.name}: {created} created, {read - created} skipped; '
+                f'{self.progress(source, read, started)}'
+            ))
+            if source in CACHE_NAMESPACES:
+                invalidate_cache(CACHE_NAMESPACES[source])
+        if {'users', 'recipes', 'follows'} & set(sources):
+            call_command('recount', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+        if 'recipes' in sources:
+            self.stdout.write(
+                'Run build_image_variants to resize the loaded images.'
+            )
+
+    @staticmethod
+    def progress(source, read, started):
+        elapsed = time.monotonic() - started
+        return (f'{source}: {read} rows in {elapsed:.1f}s '
+                f'({read / max(elapsed, 1e-6):.0f} rows/s)')
+
+    def load_ingredients(self, rows):
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=row['name'],
+                        measurement_unit=row['measurement_unit'])
+             for row in rows),
+            ignore_conflicts=True
+        )
+
+    def load_tags(self, rows):
+        tags = Tag.objects.in_bulk(
+            [row['slug'] for row in rows], field_name='slug'
+        )
+        changed = []
+        for row in rows:
+            tag = tags.get(row['slug'])
+            if tag is None:
+                continue
+            if (tag.name, tag.color) != (row['name'], row['color']):
+                tag.name, tag.color = row['name'], row['color']
+                changed.append(tag)
+        Tag.objects.bulk_update(changed, ('name', 'color'))
+        Tag.objects.bulk_create(
+            (Tag(**row) for row in rows if row['slug'] not in tags),
+            ignore_conflicts=True
+        )
+
+    def load_users(self, rows):
+        passwords = self.password_hashes
+        users = []
+        for row in rows:
+            password = row.get('password')
+            if not password:
+                password = make_password(None)
+            elif self.hashed_passwords:
+                try:
+                    identify_hasher(password)
+                except ValueError:
+                    raise CommandError(
+                        f'{row["email"]}: password is not a Django hash'
+                    )
+            else:
+                if password not in passwords:
+                    passwords[password] = make_password(password)
+                password = passwords[password]
+            users.append(CustomUser(
+                email=row['email'],
+                username=row['username'],
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                password=password,
+            ))
+        CustomUser.objects.bulk_create(users, ignore_conflicts=True)
+
+    def get_users(self, emails):
+        return {
+            email: pk for email, pk in CustomUser.objects.filter(
+                email__in=set(emails)
+            ).values_list('email', 'pk')
+        }
+
+    def load_follows(self, rows):
+        users = self.get_users(
+            email for row in rows
+            for email in (row['follower'], row['following'])
+        )
+        Follow.objects.bulk_create(
+            (Follow(follower_id=users[row['follower']],
+                    following_id=users[row['following']])
+             for row in rows
+             if row['follower'] in users and row['following'] in users
+             and row['follower'] != row['following']),
+            ignore_conflicts=True
+        )
+
+    def get_ingredients(self, rows):
+        keys = {
+            (item['name'], item['measurement_unit'])
+            for row in rows for item in row.get('ingredients', ())
+        }
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in keys),
+            ignore_conflicts=True
+        )
+        return {
+            (name, unit): pk for pk, name, unit in Ingredient.objects.filter(
+                name__in={name for name, _ in keys}
+            ).values_list('pk', 'name', 'measurement_unit')
+        }
+
+    def load_recipes(self, rows):
+        users = self.get_users(row['author'] for row in rows)
+        rows = [row for row in rows if row['author'] in users]
+        names = {row['name'] for row in rows}
+        existing = set(Recipe.objects.filter(
+            author_id__in=users.values(), name__in=names
+        ).values_list('author_id', 'name'))
+        new_rows = {}
+        for row in rows:
+            key = (users[row['author']], row['name'])
+            if key not in existing:
+                new_rows.setdefault(key, row)
+        if not new_rows:
+            return
+        Recipe.objects.bulk_create(
+            Recipe(author_id=author, name=name, text=row['text'],
+                   cooking_time=row['cooking_time'], image=row['image'])
+            for (author, name), row in new_rows.items()
+        )
+        recipes = {
+            (author, name): pk for pk, author, name in Recipe.objects.filter(
+                author_id__in={author for author, _ in new_rows},
+                name__in={name for _, name in new_rows}
+            ).values_list('pk', 'author_id', 'name')
+        }
+        tags = dict(Tag.objects.values_list('slug', 'pk'))
+        ingredients = self.get_ingredients(new_rows.values())
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipes[key], tag_id=tags[slug])
+             for key, row in new_rows.items()
+             for slug in row.get('tags', ()) if slug in tags),
+            ignore_conflicts=True
+        )
+        amounts = []
+        for key, row in new_rows.items():
+            for item in row.get('ingredients', ()):
+                ingredient = (item['name'], item['measurement_unit'])
+                amounts.append(RecipeIngredient(
+                    recipe_id=recipes[key],
+                    ingredient_id=ingredients[ingredient],
+                    amount=item['amount'],
+                ))
+        RecipeIngredient.objects.bulk_create(amounts, ignore_conflicts=True)
+        update_search_vector(
+            Recipe.objects.filter(pk__in=[recipes[key] for key in new_rows])
         )
@@ -0,0 +1,50 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.models import FeedItem, Recipe
+from users.models import CustomUser, Follow
+
+
+class Command(BaseCommand):
+    help = ('Fill the stored feeds with the latest recipes of every followed '
+            'author that is not popular enough to be merged on read.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the stored feeds first.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            FeedItem.objects.all().delete()
+        authors = CustomUser.objects.filter(
+            followers_count__gt=0,
+            followers_count__lte=settings.FEED_FANOUT_LIMIT,
+            recipes_count__gt=0,
+        ).values_list('pk', flat=True)
+        total = 0
+        for author in authors.iterator():
+            recipes = list(Recipe.objects.filter(author_id=author).order_by(
+                '-pub_date', '-id'
+            ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE])
+            followers = Follow.objects.filter(
+                following_id=author
+            ).values_list('follower_id', flat=True).iterator()
+            while True:
+                batch = list(islice(followers, settings.FEED_BATCH_SIZE))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    FeedItem.objects.bulk_create(
+                        (FeedItem(user_id=user, recipe_id=recipe,
+                                  author_id=author, pub_date=pub_date)
+                         for user in batch for recipe, pub_date in recipes),
+                        batch_size=settings.FEED_BATCH_SIZE,
+                        ignore_conflicts=True
+                    )
+                total += len(batch) * len(recipes)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} feed entries written'
+        ))
@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Follow
+
+COUNTERS = {
+    Recipe: {
+        'favorites_count': (Favorite, 'recipe'),
+        'in_carts_count': (ShoppingCart, 'recipe'),
+    },
+    CustomUser: {
+        'recipes_count': (Recipe, 'author'),
+        'followers_count': (Follow, 'following'),
+        'following_count': (Follow, 'follower'),
+    },
+}
+
+
+def count_rows(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized counters that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, counters in COUNTERS.items():
+            last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+            for counter, (source, field) in counters.items():
+                actual = count_rows(source, field)
+                fixed = 0
+                for start in range(0, last_pk + 1, batch_size):
+                    with transaction.atomic():
+                        fixed += model.objects.filter(
+                            pk__gte=start, pk__lt=start + batch_size
+                        ).exclude(**{counter: actual}).update(
+                            **{counter: actual}
+                        )
+                self.stdout.write(
+                    f'{model.__name__}.{counter}: {fixed} fixed'
+                )
+        self.stdout.write(self.style.SUCCESS('OK'))
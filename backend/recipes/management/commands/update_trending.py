@@ -0,0 +1,72 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from recipes.constants import TRENDING_MIN_SCORE, TRENDING_WEIGHTS
+from recipes.models import Favorite, RecipeScore, ShoppingCart
+
+EVENT_MODELS = {
+    'favorite': Favorite,
+    'shopping_cart': ShoppingCart,
+}
+
+
+class Command(BaseCommand):
+    help = ('Decay trending scores and add favorites and cart additions '
+            'made since the previous run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+        decay_rate = math.log(2) / half_life
+        now = timezone.now()
+        with transaction.atomic():
+            last_run = RecipeScore.objects.aggregate(
+                last=Max('updated'))['last']
+            if last_run is None:
+                last_run = now - timedelta(seconds=half_life * 7)
+            elapsed = max((now - last_run).total_seconds(), 0)
+            RecipeScore.objects.update(
+                trending=F('trending') * math.exp(-decay_rate * elapsed),
+                updated=now,
+            )
+            gains = defaultdict(float)
+            for event, model in EVENT_MODELS.items():
+                weight = TRENDING_WEIGHTS[event]
+                events = model.objects.filter(
+                    created__gt=last_run, created__lte=now
+                ).values_list('recipe_id', 'created').iterator()
+                for recipe_id, created in events:
+                    age = (now - created).total_seconds()
+                    gains[recipe_id] += weight * math.exp(-decay_rate * age)
+            scores = RecipeScore.objects.in_bulk(list(gains))
+            for recipe_id, gain in gains.items():
+                if recipe_id in scores:
+                    scores[recipe_id].trending += gain
+                else:
+                    scores[recipe_id] = RecipeScore(
+                        recipe_id=recipe_id, trending=gain, updated=now
+                    )
+            existing = [
+                score for score in scores.values() if not score._state.adding
+            ]
+            RecipeScore.objects.bulk_update(
+                existing, ('trending',), batch_size=options['batch_size']
+            )
+            RecipeScore.objects.bulk_create(
+                [score for score in scores.values() if score._state.adding],
+                batch_size=options['batch_size']
+            )
+            removed, _ = RecipeScore.objects.filter(
+                trending__lt=TRENDING_MIN_SCORE).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(gains)} recipes updated, {removed} expired'
+        ))
@@ -1,4 +1,6 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
@@ -6,6 +8,7 @@ from django.db.models import UniqueConstraint
 from users.models import CustomUser
 
 from .constants import COLOR_MAX_LENGTH, NAME_MAX_LENGTH
+from .storage import recipe_image_storage
 
 
 class Ingredient(models.Model):
@@ -59,7 +62,14 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         'Картинка',
-        upload_to=settings.IMAGE_UPLOAD_PATH
+        upload_to=settings.IMAGE_UPLOAD_PATH,
+        storage=recipe_image_storage
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии картинки'
     )
     name = models.CharField(max_length=NAME_MAX_LENGTH,
                             verbose_name='Название рецепта')
@@ -87,11 +97,40 @@ class Recipe(models.Model):
         verbose_name='Дата создания',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-favorites_count', '-pub_date'],
+                         name='recipe_popular_idx'),
+            models.Index(fields=['cooking_time', '-pub_date'],
+                         name='recipe_cooking_time_idx'),
+            GinIndex(fields=['search_vector'],
+                     name='recipe_search_vector_idx'),
+            GinIndex(fields=['name'], name='recipe_name_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return f' {self.name}. Recipe author: {self.author}'
@@ -145,6 +184,11 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепты',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -153,6 +197,10 @@ class Favorite(models.Model):
             UniqueConstraint(fields=['user', 'recipe'],
                              name='unique_favorite')
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='favorite_recipe_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.recipe} in fav {self.user}!'
@@ -173,6 +221,11 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепты',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         verbose_name = 'Рецепт в списке покупок'
@@ -181,6 +234,76 @@ class ShoppingCart(models.Model):
             UniqueConstraint(fields=['user', 'recipe'],
                              name='unique_shopping_cart')
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='shopping_cart_recipe_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.recipe} in cart {self.user}!'
+
+
+class RecipeScore(models.Model):
+    """Precomputed trending score of a recipe."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт',
+    )
+    trending = models.FloatField(default=0, verbose_name='Популярность')
+    updated = models.DateTimeField(verbose_name='Дата пересчёта')
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(fields=['-trending'],
+                         name='recipe_score_trending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.trending:.3f}'
+
+
+class FeedItem(models.Model):
+    """Recipe of a followed author, copied into the follower's feed."""
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            UniqueConstraint(fields=['user', 'recipe'],
+                             name='unique_feed_item')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} in feed of {self.user}'
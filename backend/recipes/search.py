@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    Case, CharField, F, FloatField, Func, OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Recipe, RecipeIngredient
+
+
+class Casefold(Func):
+    """Unicode-aware case folding on SQLite.
+
+    SQLite's own ``LOWER`` and ``LIKE`` only fold ASCII letters, so
+    Cyrillic names would be matched case-sensitively.
+    """
+
+    function = 'CASEFOLD'
+    output_field = CharField()
+
+
+def register_casefold(connection):
+    """Add ``CASEFOLD`` to a new SQLite connection."""
+    connection.create_function(
+        'CASEFOLD', 1,
+        lambda value: None if value is None else value.casefold(),
+        deterministic=True,
+    )
+
+
+def search_vector():
+    """Weighted vector over recipe name, ingredient names and text."""
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', delimiter=' ')
+        ).values('names')
+    )
+    config = settings.SEARCH_CONFIG
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(Coalesce(ingredient_names, Value('')),
+                       weight='B', config=config)
+        + SearchVector('text', weight='C', config=config)
+    )
+
+
+def update_search_vector(recipes):
+    """Refresh the stored search vector of the given recipes."""
+    if connection.vendor != 'postgresql':
+        return
+    Recipe.objects.filter(
+        pk__in=recipes.values('pk')
+    ).update(search_vector=search_vector())
+
+
+def search_recipes(queryset, value):
+    """Filter recipes by full-text query and order them by rank.
+
+    Recipe names that only match by trigram similarity are kept too, so
+    typos still find something. SQLite falls back to case-insensitive
+    substring matching.
+    """
+    if connection.vendor != 'postgresql':
+        value = value.casefold()
+        ingredients = RecipeIngredient.objects.alias(
+            folded_name=Casefold('ingredient__name')
+        ).filter(folded_name__contains=value)
+        return queryset.alias(
+            folded_name=Casefold('name'), folded_text=Casefold('text')
+        ).filter(
+            Q(folded_name__contains=value)
+            | Q(folded_text__contains=value)
+            | Q(pk__in=ingredients.values('recipe'))
+        ).annotate(
+            rank=Case(
+                When(folded_name__contains=value, then=Value(1.0)),
+                When(folded_text__contains=value, then=Value(0.2)),
+                default=Value(0.4),
+                output_field=FloatField(),
+            )
+        ).order_by('-rank', '-pub_date')
+    query = SearchQuery(
+        value, config=settings.SEARCH_CONFIG, search_type='websearch'
+    )
+    return queryset.filter(
+        Q(search_vector=query) | Q(name__trigram_similar=value)
+    ).annotate(
+        rank=SearchRank(F('search_vector'), query)
+        + TrigramSimilarity('name', value)
+    ).order_by('-rank', '-pub_date')
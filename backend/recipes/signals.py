@@ -0,0 +1,70 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from users.models import CustomUser, Follow
+
+from .counters import RECIPE_COUNTERS, change_counter
+from .models import Favorite, Recipe, ShoppingCart
+from .search import register_casefold
+
+# Sent with ``recipe_id`` once resized copies of a recipe's image are
+# stored. update() sends no post_save, so listeners that cache recipes
+# subscribe to this instead.
+image_variants_built = Signal()
+
+# The counters follow single-row saves and deletes, including admin edits
+# and cascades. bulk_create sends no signals, so its callers update the
+# counters themselves; the recount command repairs any drift.
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_marked(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                       RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_unmarked(sender, instance, **kwargs):
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    if created:
+        change_counter(CustomUser.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    change_counter(CustomUser.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(instance, created, **kwargs):
+    if created:
+        change_follow_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    change_follow_counters(instance, -1)
+
+
+def change_follow_counters(follow, delta):
+    change_counter(CustomUser.objects.filter(pk=follow.following_id),
+                   'followers_count', delta)
+    change_counter(CustomUser.objects.filter(pk=follow.follower_id),
+                   'following_count', delta)
+
+
+@receiver(connection_created)
+def register_sqlite_functions(connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        register_casefold(connection.connection)
@@ -0,0 +1,56 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Store files under the SHA-256 of their content.
+
+    ``recipes/images/temp.jpeg`` becomes ``recipes/images/ab/<hash>.jpeg``,
+    so saving the same content twice returns the existing file and
+    stored files never change. Saving touches the existing file, so
+    ``collect_orphan_images`` treats a re-uploaded orphan as new.
+    """
+
+    hash_chunk_size = 64 * 1024
+
+    def content_hash(self, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(self.hash_chunk_size):
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = self.content_hash(content)
+        name = os.path.join(directory, digest[:2], digest + extension)
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            pass
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            # Collected since the existence check; store it again.
+            return super().save(name, content, max_length)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # The file under this name already holds the same content.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return super().get_available_name(name, max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
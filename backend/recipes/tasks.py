@@ -0,0 +1,39 @@
+from taskqueue.queue import task
+from users.models import CustomUser, Follow
+
+from .feed import backfill, fan_out
+from .images import process_recipe_image
+from .models import Recipe
+from .search import update_search_vector
+
+
+@task()
+def build_image_variants(recipe_id, name):
+    process_recipe_image(recipe_id, name)
+
+
+@task()
+def refresh_search_vector(recipe_ids=None, ingredient_id=None):
+    recipes = Recipe.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    if ingredient_id is not None:
+        recipes = recipes.filter(ingredients=ingredient_id)
+    update_search_vector(recipes)
+
+
+@task()
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.objects.select_related('author').filter(
+        pk=recipe_id).first()
+    if recipe is not None:
+        fan_out(recipe)
+
+
+@task()
+def backfill_feed(user_id, author_id):
+    follow = Follow.objects.filter(
+        follower_id=user_id, following_id=author_id
+    ).select_related('following').first()
+    if follow is not None:
+        backfill(CustomUser(pk=user_id), follow.following)
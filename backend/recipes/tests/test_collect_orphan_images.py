@@ -0,0 +1,84 @@
+import os
+import time
+from io import StringIO
+
+import pytest
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from recipes.management.commands.collect_orphan_images import Command
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+from users.models import CustomUser
+
+pytestmark = pytest.mark.django_db
+
+OLD = 'recipes/images/aa/aa11.png'
+ORPHAN = 'recipes/images/bb/bb22.png'
+VARIANT = 'recipes/variants/aa/aa11_small.webp'
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    week_ago = time.time() - 7 * 24 * 3600
+    for name in (OLD, ORPHAN, VARIANT):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'image')
+        os.utime(path, (week_ago, week_ago))
+    return tmp_path
+
+
+def test_file_referenced_during_walk_is_kept(media, monkeypatch):
+    author = CustomUser.objects.create_user(
+        email='author@example.com', username='author', password='pass'
+    )
+    walk = Command.walk
+
+    def reupload_then_walk(self, storage, directory):
+        if not Recipe.objects.exists():
+            Recipe.objects.create(
+                author=author, name='Старый', text='Текст', cooking_time=1,
+                image=OLD,
+                image_variants={'small': {'webp': VARIANT}},
+            )
+        yield from walk(self, storage, directory)
+
+    monkeypatch.setattr(Command, 'walk', reupload_then_walk)
+    stdout = StringIO()
+    call_command('collect_orphan_images', stdout=stdout)
+    assert (media / OLD).exists()
+    assert (media / VARIANT).exists()
+    assert not (media / ORPHAN).exists()
+    assert '1 files deleted, 2 kept' in stdout.getvalue()
+
+
+def test_reupload_touches_the_existing_file(media):
+    name = recipe_image_storage.save(
+        'recipes/images/temp.png', ContentFile(b'image'))
+    age = time.time() - os.path.getmtime(media / name)
+    os.utime(media / name, (0, 0))
+    assert recipe_image_storage.save(
+        'recipes/images/again.png', ContentFile(b'image')) == name
+    assert time.time() - os.path.getmtime(media / name) <= age + 60
+
+
+def test_reupload_after_recheck_is_kept(media, monkeypatch):
+    name = recipe_image_storage.save(
+        'recipes/images/temp.png', ContentFile(b'old image'))
+    os.utime(media / name, (0, 0))
+    referenced_now = Command.referenced_now
+
+    def reupload_after_recheck(self, names):
+        referenced = referenced_now(self, names)
+        if name in names:
+            recipe_image_storage.save(
+                'recipes/images/again.png', ContentFile(b'old image'))
+        return referenced
+
+    monkeypatch.setattr(Command, 'referenced_now', reupload_after_recheck)
+    call_command('collect_orphan_images', stdout=StringIO())
+    assert (media / name).exists()
+    assert not (media / ORPHAN).exists()
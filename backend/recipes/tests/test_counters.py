@@ -0,0 +1,77 @@
+import pytest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Follow
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users():
+    return [
+        CustomUser.objects.create_user(
+            username=name, email=f'{name}@example.com', password='pass')
+        for name in ('author', 'reader')
+    ]
+
+
+def create_recipe(author):
+    return Recipe.objects.create(
+        author=author, name='Recipe', text='Text', cooking_time=10,
+        image='recipes/images/recipe.png',
+    )
+
+
+def test_orm_writes_keep_counters(users):
+    author, reader = users
+    recipe = create_recipe(author)
+    favorite = Favorite.objects.create(user=reader, recipe=recipe)
+    ShoppingCart.objects.create(user=reader, recipe=recipe)
+    Follow.objects.create(follower=reader, following=author)
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    reader.refresh_from_db()
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+    assert (author.recipes_count, author.followers_count) == (1, 1)
+    assert reader.following_count == 1
+
+    favorite.delete()
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == 0
+
+    # Cascades remove the reader's cart entry and subscription.
+    reader.delete()
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert recipe.in_carts_count == 0
+    assert author.followers_count == 0
+
+    recipe.delete()
+    author.refresh_from_db()
+    assert author.recipes_count == 0
+
+
+def test_admin_delete_keeps_counters(client, users):
+    author, reader = users
+    client.force_login(CustomUser.objects.create_superuser(
+        username='admin', email='admin@example.com', password='pass',
+        first_name='Admin', last_name='Admin',
+    ))
+    recipe = create_recipe(author)
+    response = client.post('/admin/recipes/favorite/add/',
+                           {'user': reader.pk, 'recipe': recipe.pk})
+    assert response.status_code == 302
+    Favorite.objects.create(user=author, recipe=recipe)
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == 2
+    favorite = Favorite.objects.get(user=reader)
+    response = client.post(
+        f'/admin/recipes/favorite/{favorite.pk}/delete/', {'post': 'yes'})
+    assert response.status_code == 302
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == 1
+    response = client.post(
+        f'/admin/recipes/recipe/{recipe.pk}/delete/', {'post': 'yes'})
+    assert response.status_code == 302
+    author.refresh_from_db()
+    assert author.recipes_count == 0
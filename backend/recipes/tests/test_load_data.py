@@ -0,0 +1,38 @@
+from io import StringIO
+
+import pytest
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+
+from users.models import CustomUser
+
+pytestmark = pytest.mark.django_db
+
+HEADER = 'email,username,first_name,last_name,password\n'
+
+
+def load_users(tmp_path, rows, *args):
+    (tmp_path / 'users.csv').write_text(HEADER + rows, encoding='utf-8')
+    call_command('load_data', 'users', '--data-dir', str(tmp_path), *args,
+                 stdout=StringIO())
+
+
+def test_passwords_are_hashed(tmp_path):
+    load_users(
+        tmp_path,
+        'a@example.com,a,A,A,\n'
+        'b@example.com,b,B,B,0123456789abcdef0123456789abcdef\n',
+    )
+    users = {user.username: user for user in CustomUser.objects.all()}
+    assert not users['a'].has_usable_password()
+    assert users['b'].check_password('0123456789abcdef0123456789abcdef')
+
+
+def test_hashed_passwords(tmp_path):
+    load_users(tmp_path, f'a@example.com,a,A,A,{make_password("secret")}\n',
+               '--hashed-passwords')
+    assert CustomUser.objects.get().check_password('secret')
+    with pytest.raises(CommandError):
+        load_users(tmp_path, 'b@example.com,b,B,B,secret\n',
+                   '--hashed-passwords')
@@ -0,0 +1,74 @@
+import pytest
+
+from django.db import connection
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import search_recipes, update_search_vector
+from users.models import CustomUser
+
+pytestmark = pytest.mark.django_db
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Full-text search needs PostgreSQL.'
+)
+
+
+@pytest.fixture
+def recipes():
+    author = CustomUser.objects.create_user(
+        username='author', email='author@example.com', password='pass')
+    beet = Ingredient.objects.create(name='Свёкла', measurement_unit='г')
+    recipes = {}
+    for name, text in (
+        ('Борщ', 'Суп со свёклой.'),
+        ('Винегрет', 'Салат, который подают к борщу.'),
+        ('Сырники', 'Творог и мука.'),
+    ):
+        recipes[name] = Recipe.objects.create(
+            author=author, name=name, text=text, cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+    RecipeIngredient.objects.create(
+        recipe=recipes['Винегрет'], ingredient=beet, amount=100)
+    update_search_vector(Recipe.objects.all())
+    return recipes
+
+
+def names(queryset):
+    return [recipe.name for recipe in queryset]
+
+
+def test_search_ignores_unicode_case(recipes):
+    assert names(search_recipes(Recipe.objects.all(), 'БОРЩ')) == [
+        'Борщ', 'Винегрет'
+    ]
+    assert names(search_recipes(Recipe.objects.all(), 'свёкла')) == [
+        'Винегрет'
+    ]
+
+
+@postgresql_only
+# The refresh task is deferred until commit.
+@pytest.mark.django_db(transaction=True)
+def test_search_vector_is_refreshed(recipes):
+    beet = Ingredient.objects.get()
+    beet.name = 'Буряк'
+    beet.save()
+    assert names(search_recipes(Recipe.objects.all(), 'буряк')) == [
+        'Винегрет'
+    ]
+
+
+@postgresql_only
+def test_search_ranks_names_first(recipes):
+    assert names(search_recipes(Recipe.objects.all(), 'борщ')) == [
+        'Борщ', 'Винегрет'
+    ]
+
+
+@postgresql_only
+def test_search_falls_back_to_trigrams(recipes):
+    assert names(search_recipes(Recipe.objects.all(), 'Сырнеки')) == [
+        'Сырники'
+    ]
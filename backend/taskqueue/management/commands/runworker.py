@@ -0,0 +1,72 @@
+import signal
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from taskqueue.queue import claim, execute, purge_finished, release_stale
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Run deferred tasks from the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--visibility-timeout', type=int, default=600,
+            help='Seconds after which a running task is assumed lost and '
+                 'requeued.'
+        )
+        parser.add_argument(
+            '--keep-finished', type=int, default=7 * 24 * 60 * 60,
+            help='Seconds to keep done and failed tasks; they are purged '
+                 'hourly. 0 keeps them forever.'
+        )
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no task is due.')
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        name = uuid.uuid4().hex[:8]
+        timeout = timedelta(seconds=options['visibility_timeout'])
+        threads = options['threads']
+        self.stdout.write(f'Worker {name} started with {threads} threads')
+        processed = 0
+        purged_at = None
+        with ThreadPoolExecutor(threads, thread_name_prefix=name) as pool:
+            while self.running:
+                if options['keep_finished'] and (
+                    purged_at is None
+                    or time.monotonic() - purged_at > PURGE_INTERVAL
+                ):
+                    purged_at = time.monotonic()
+                    purged = purge_finished(
+                        timedelta(seconds=options['keep_finished'])
+                    )
+                    if purged:
+                        self.stdout.write(f'{purged} finished tasks purged')
+                released = release_stale(timeout)
+                if released:
+                    self.stdout.write(f'{released} stale tasks requeued')
+                tasks = claim(threads * 2)
+                if tasks:
+                    processed += len(list(pool.map(execute, tasks)))
+                    continue
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker {name} stopped after {processed} tasks'
+        ))
+
+    def stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Deferred call of a registered task function."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=200, verbose_name='Задача')
+    kwargs = models.JSONField(default=dict, verbose_name='Аргументы')
+    idempotency_key = models.CharField(
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Ключ идемпотентности'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveIntegerField(default=0,
+                                           verbose_name='Попыток')
+    run_at = models.DateTimeField(default=timezone.now,
+                                  verbose_name='Запустить после')
+    locked_at = models.DateTimeField(null=True, blank=True,
+                                     verbose_name='Взята в работу')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Создана')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
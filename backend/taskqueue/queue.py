@@ -0,0 +1,113 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name=None, max_attempts=5):
+    """Register a function that can be deferred with ``defer``."""
+
+    def decorator(function):
+        task_name = name or f'{function.__module__}.{function.__name__}'
+        function.task_name = task_name
+        function.max_attempts = max_attempts
+        registry[task_name] = function
+        return function
+
+    return decorator
+
+
+def defer(function, key=None, **kwargs):
+    """Run a task once the current transaction commits.
+
+    In the default mode the task row is written inside the transaction,
+    so the worker only sees it after commit and it is dropped on
+    rollback. With ``TASKS_SYNC`` the task runs in-process on commit.
+    A task with a ``key`` that was already queued is not queued again.
+    """
+    if settings.TASKS_SYNC:
+        transaction.on_commit(lambda: function(**kwargs))
+        return
+    Task.objects.bulk_create([Task(
+        name=function.task_name, kwargs=kwargs, idempotency_key=key
+    )], ignore_conflicts=True)
+
+
+def backoff(attempts):
+    delay = min(settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1),
+                settings.TASKS_RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(1, 1.25))
+
+
+def claim(limit):
+    """Lock the next due tasks for this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(Task.objects.select_for_update(skip_locked=True).filter(
+            status=Task.PENDING, run_at__lte=now
+        ).order_by('run_at')[:limit])
+        Task.objects.filter(pk__in=[item.pk for item in tasks]).update(
+            status=Task.RUNNING, locked_at=now
+        )
+    return tasks
+
+
+def purge_finished(age, batch_size=1000):
+    """Delete done and failed tasks created more than ``age`` ago."""
+    finished = Task.objects.filter(
+        status__in=(Task.DONE, Task.FAILED),
+        created__lt=timezone.now() - age
+    )
+    deleted = 0
+    while True:
+        pks = list(finished.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += Task.objects.filter(pk__in=pks).delete()[0]
+
+
+def release_stale(timeout):
+    """Requeue tasks of workers that died while running them."""
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=timezone.now() - timeout
+    ).update(status=Task.PENDING, locked_at=None)
+
+
+def execute(item):
+    """Run a claimed task and record the outcome."""
+    close_old_connections()
+    function = registry.get(item.name)
+    item.attempts += 1
+    try:
+        if function is None:
+            raise LookupError(f'Unknown task {item.name}')
+        function(**item.kwargs)
+    except Exception:
+        item.last_error = traceback.format_exc()
+        max_attempts = getattr(function, 'max_attempts', 1)
+        if item.attempts < max_attempts:
+            item.status = Task.PENDING
+            item.run_at = timezone.now() + backoff(item.attempts)
+        else:
+            item.status = Task.FAILED
+        logger.warning('Task %s failed (attempt %s): %s', item.name,
+                       item.attempts, item.last_error.splitlines()[-1])
+    else:
+        item.status = Task.DONE
+        item.last_error = ''
+    item.locked_at = None
+    item.save(update_fields=(
+        'status', 'attempts', 'run_at', 'locked_at', 'last_error'
+    ))
+    close_old_connections()
+    return item.status
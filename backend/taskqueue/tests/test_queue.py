@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+import pytest
+
+from django.utils import timezone
+
+from taskqueue.models import Task
+from taskqueue.queue import purge_finished
+
+pytestmark = pytest.mark.django_db
+
+
+def test_purge_finished_keeps_recent_and_pending_tasks():
+    old = timezone.now() - timedelta(days=8)
+    for status in (Task.DONE, Task.FAILED, Task.PENDING, Task.RUNNING):
+        Task.objects.create(name='old', status=status)
+        Task.objects.create(name='new', status=status)
+    Task.objects.filter(name='old').update(created=old)
+
+    assert purge_finished(timedelta(days=7), batch_size=1) == 2
+    assert sorted(Task.objects.values_list('name', 'status')) == [
+        ('new', Task.DONE), ('new', Task.FAILED), ('new', Task.PENDING),
+        ('new', Task.RUNNING), ('old', Task.PENDING), ('old', Task.RUNNING),
+    ]
@@ -10,6 +10,8 @@ class CustomUserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
     search_fields = ('username',)
 
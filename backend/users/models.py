@@ -31,6 +31,21 @@ class CustomUser(AbstractUser):
         verbose_name='Пароль',
         max_length=NAME_MAX_LENGTH,
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписок'
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
         'username',
@@ -87,6 +102,10 @@ class Follow(models.Model):
                 name='unique_follow',
             )
         ]
+        indexes = [
+            models.Index(fields=['following', 'follower'],
+                         name='follow_following_follower_idx'),
+        ]
 
     def __str__(self):
         return f'Author: {self.following}, follower: {self.follower}'